@@ -4,16 +4,385 @@ Provides Claude's advanced reasoning capabilities for payment routing and data g
 """
 
 import os
+import re
 import asyncio
-from typing import Dict, Any, Optional, List
+import hashlib
+import math
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
+from functools import partial
+from enum import IntEnum
 from datetime import datetime
 import json
-from anthropic import AsyncAnthropic
+import random
+import httpx
+from anthropic import (
+    AsyncAnthropic, APIError, APIConnectionError, InternalServerError, RateLimitError
+)
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # optional C serializer; falls back to the json module
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
+# One Anthropic client (and so one keep-alive connection pool) per API key,
+# shared by every ClaudeClient and ClaudeDecisionEngine in the process instead
+# of a new TLS session each
+_SHARED_CLIENTS: Dict[str, AsyncAnthropic] = {}
+
+
+def get_shared_client(api_key: str) -> AsyncAnthropic:
+    """Return the process-wide Anthropic client for an API key, creating it on first use."""
+    client = _SHARED_CLIENTS.get(api_key)
+    if client is None:
+        # Sized for both users' bursts; connections stay warm between them
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=128, keepalive_expiry=60.0),
+            timeout=httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=5.0)
+        )
+        # Retries are made by the callers (ClaudeClient._with_retries,
+        # ClaudeDecisionEngine._with_backoff), inside their own timeouts
+        client = _SHARED_CLIENTS[api_key] = AsyncAnthropic(
+            api_key=api_key, http_client=http_client, max_retries=0
+        )
+    return client
+
+
+async def shutdown_shared_clients():
+    """Close every shared Anthropic client. Call once at process shutdown."""
+    while _SHARED_CLIENTS:
+        _, client = _SHARED_CLIENTS.popitem()
+        await client.close()
+
+
+def _cached_system(text: str) -> List[Dict[str, Any]]:
+    """Wrap static prompt text as a system block marked for prompt caching."""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+# Static prompt sections. These go out as cached system blocks, so each call
+# only sends (and the API only re-processes) the per-request context.
+ROUTING_REQUIREMENTS = """
+        REQUIREMENTS:
+        1. If primary processor is frozen, MUST use alternative
+        2. Prioritize success rate over fees for high-value transactions
+        3. Consider recent failure patterns
+        4. Provide clear reasoning for your choice
+        """
+
+ROUTING_ANALYSIS = {
+    "comprehensive": """
+            
+        COMPREHENSIVE ANALYSIS REQUIRED:
+        - Perform deep analysis of all risk factors
+        - Consider historical patterns and trends
+        - Evaluate processor reliability and cost optimization
+        - Assess regulatory compliance implications
+        - Provide detailed step-by-step reasoning
+        """,
+    "balanced": """
+            
+        BALANCED ANALYSIS:
+        - Consider key risk factors and processor health
+        - Balance reliability with cost efficiency
+        - Provide clear reasoning for decision
+        """,
+    "simple": ""
+}
+
+ROUTING_RESPONSE_FORMAT = """
+
+        Please respond in this order, starting each of the first three lines
+        with its label:
+        1. Selected processor: <processor ID>
+        2. Confidence: <0-1>
+        3. Reasoning: <one-sentence summary of your choice>
+        4. Fallback chain (ordered list of alternatives)
+        5. Risk assessment and detailed reasoning
+        """
+
+DATA_GEN_REQUIREMENTS = """
+        GENERATE REALISTIC STRIPE TRANSACTION DATA
+
+        Stripe Freeze Thresholds:
+        - Refund rate >5% = Investigation triggered
+        - Chargeback rate >1% = Immediate freeze + 180-day hold
+        - Volume spike >10x normal = Account review within 24 hours
+
+        Every generation plan must create transactions that:
+        1. Follow authentic Stripe patterns (proper fees, timing, IDs)
+        2. Create the specified risk scenario
+        3. Include realistic failure reasons and customer behavior
+        4. Use proper Stripe balance_transaction format
+        """
+
+DATA_GEN_ANALYSIS = {
+    "comprehensive": """
+            
+        COMPREHENSIVE GENERATION:
+        - Include detailed behavioral patterns and timing analysis
+        - Generate multiple risk scenarios with interconnected factors
+        - Provide statistical analysis of generated patterns
+        - Include fraud detection considerations
+        - Generate compliance documentation
+        """,
+    "balanced": "",
+    "simple": ""
+}
+
+DATA_GEN_FOCUS = "\n\nFocus on realism - this data will be used to test payment systems."
+
+RISK_THRESHOLDS = """
+        ANALYZE TRANSACTION PATTERNS FOR STRIPE FREEZE RISK
+
+        Stripe Risk Thresholds:
+        - Refund rate >5% = Review triggered
+        - Chargeback rate >1% = Immediate freeze
+        - Volume spikes >10x = Account investigation
+        - Pattern inconsistencies = Documentation required
+        """
+
+RISK_ANALYSIS = {
+    "comprehensive": """
+            
+        COMPREHENSIVE RISK ANALYSIS:
+        - Perform deep statistical analysis of patterns
+        - Identify subtle risk indicators and correlations
+        - Provide timeline-based risk progression analysis
+        - Include behavioral scoring and anomaly detection
+        - Generate detailed mitigation strategies
+        """,
+    "balanced": "",
+    "simple": ""
+}
+
+RISK_RESPONSE_FORMAT = """
+
+        Please provide:
+        1. Risk level assessment (low/medium/high/critical)
+        2. Specific patterns detected
+        3. Freeze probability (0-100%)
+        4. Detailed reasoning for your assessment
+        5. Actionable recommendations to reduce risk
+        6. Timeline for potential freeze if patterns continue
+
+        Be thorough in your analysis - account freezes can hold funds for 180 days.
+        """
+
+# Complete system prompts keyed by (prompt kind, complexity), assembled once
+# at import from each kind's (head, per-complexity analysis, tail) sections
+PROMPT_SECTIONS = {
+    "routing": (ROUTING_REQUIREMENTS, ROUTING_ANALYSIS, ROUTING_RESPONSE_FORMAT),
+    "data_generation": (DATA_GEN_REQUIREMENTS, DATA_GEN_ANALYSIS, DATA_GEN_FOCUS),
+    "risk_analysis": (RISK_THRESHOLDS, RISK_ANALYSIS, RISK_RESPONSE_FORMAT)
+}
+
+SYSTEM_PROMPTS = {
+    (kind, complexity): _cached_system(head + analysis + tail)
+    for kind, (head, analyses, tail) in PROMPT_SECTIONS.items()
+    for complexity, analysis in analyses.items()
+}
+
+# Data generation requirements for each pattern type
+PATTERN_REQUIREMENTS = {
+    "sudden_spike": "Generate 10-15x normal daily volume compressed into 2-3 hours. Use larger transaction amounts ($200-2000). Include realistic promotional context.",
+    "high_refund_rate": "Create 10-15% refund rate (vs normal 2%). Include varied refund reasons, proper timing delays, and customer service context.",
+    "chargeback_surge": "Generate 2-3% chargeback rate. Include proper chargeback reasons, $15 fees, and 15-60 day delays from original transactions.",
+    "pattern_deviation": "Create sudden changes in transaction size (5-10x), new geographic regions, or unusual timing patterns.",
+    "normal": "Generate consistent daily patterns, 2% refund rate, standard transaction sizes, and predictable business rhythms."
+}
+DEFAULT_PATTERN_REQUIREMENT = "Generate realistic transaction patterns"
+
+# Output token caps keyed by (prompt kind, complexity); routing answers are
+# short, while generation plans and comprehensive analyses need the room
+MAX_TOKENS = {
+    ("routing", "simple"): 256,
+    ("routing", "balanced"): 700,
+    ("routing", "comprehensive"): 1500,
+    ("data_generation", "simple"): 1500,
+    ("data_generation", "balanced"): 2500,
+    ("data_generation", "comprehensive"): 4000,
+    ("risk_analysis", "simple"): 1000,
+    ("risk_analysis", "balanced"): 2000,
+    ("risk_analysis", "comprehensive"): 3000
+}
+
+# Rough characters per output token, used to estimate the output of a stream
+# that stopped early, since its final token count never arrives
+CHARS_PER_TOKEN = 4
+
+# Per-request prompt templates, filled in with str.format_map
+USER_PROMPTS = {
+    "routing": """
+        PAYMENT ROUTING DECISION REQUIRED
+
+        Transaction Details:
+        - Amount: ${amount} {currency}
+        - Merchant: {merchant_id}
+        - Risk Level: {urgency}
+
+        Available Processors:
+        {processors}
+
+        Recent Failures:
+        {failures}
+
+        Processor Health Status:
+        {processor_health}
+        """,
+    "data_generation": """
+        Pattern Type: {pattern_type}
+        Business Context: {business_type}
+        Historical Baseline: {historical_baseline}
+
+        Requirements for {pattern_type}:
+        {pattern_requirements}
+
+        Generate a detailed plan for creating {transaction_count} transactions.
+        """,
+    "risk_analysis": """
+        Transaction Dataset:
+        - Total transactions: {transaction_count}
+        - Computed features: {features}
+        - Sample data: {sample}
+
+        Analysis Context:
+        - Business type: {business_type}
+        - Analysis window: {analysis_window}
+        """
+}
+
+
+# Prompt context serialization
+def _json_default(o: Any) -> str:
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return str(o)
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ORJSON_KEY_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def compute_risk_features(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Compute the freeze-threshold statistics for a list of Stripe balance
+    transactions in a single pass, so Claude reasons over the numbers
+    instead of estimating them from a five-row sample.
+    
+    Returns refund rate, chargeback rate (adjustments per charge), volume
+    spike (busiest hour over the mean hourly count) and the largest charge
+    amount z-score.
+    """
+    type_counts = Counter()
+    hourly_counts = Counter()
+    amount_sum = amount_sq_sum = 0.0
+    max_amount = -math.inf
+    
+    for txn in transactions:
+        txn_type = txn.get("type")
+        type_counts[txn_type] += 1
+        created = txn.get("created")
+        if created is not None:
+            hourly_counts[int(created) // 3600] += 1
+        if txn_type == "charge":
+            amount = float(txn.get("amount", 0))
+            amount_sum += amount
+            amount_sq_sum += amount * amount
+            max_amount = max(max_amount, amount)
+    
+    charges = type_counts["charge"]
+    features = {
+        "refund_rate": type_counts["refund"] / charges if charges else 0.0,
+        "chargeback_rate": type_counts["adjustment"] / charges if charges else 0.0,
+        "volume_spike": 0.0,
+        "max_amount_z_score": 0.0
+    }
+    if hourly_counts:
+        features["volume_spike"] = max(hourly_counts.values()) * len(hourly_counts) / sum(hourly_counts.values())
+    if charges > 1:
+        mean = amount_sum / charges
+        std = math.sqrt(max(amount_sq_sum / charges - mean * mean, 0.0))
+        if std > 0:
+            features["max_amount_z_score"] = (max_amount - mean) / std
+    
+    return {name: round(value, 4) for name, value in features.items()}
+
+
+# API failures worth retrying: rate limits, dropped connections and 5xx responses
+TRANSIENT_API_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """Jittered exponential delay, capped at 8s, stretched to the server's retry-after when it sends one."""
+    delay = min(2 ** attempt, 8) + random.random()
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.replace(".", "", 1).isdigit():
+        delay = max(float(retry_after), delay)
+    return delay
+
+
+async def call_with_retries(
+    call: Callable[..., Awaitable[Any]], *args: Any, max_attempts: int, **kwargs: Any
+) -> Any:
+    """Make an API call, retrying transient failures up to max_attempts times in all."""
+    for attempt in range(max_attempts):
+        try:
+            return await call(*args, **kwargs)
+        except TRANSIENT_API_ERRORS as e:
+            if attempt == max_attempts - 1:
+                raise
+            await asyncio.sleep(retry_delay(attempt, e))
+
+
+# Response parsing tables
+class RoutableProcessor(IntEnum):
+    """Processors Claude can select, in tie-break priority order."""
+    STRIPE = 0
+    PAYPAL = 1
+    VISA = 2
+    SQUARE = 3
+    ADYEN = 4
+
+
+ROUTABLE_PROCESSORS = tuple(processor.name.lower() for processor in RoutableProcessor)
+PROCESSOR_BY_ID = {processor_id: RoutableProcessor(i) for i, processor_id in enumerate(ROUTABLE_PROCESSORS)}
+# Fallback chain for each selected processor, indexed by RoutableProcessor
+PROCESSOR_FALLBACKS = (
+    ("paypal", "visa"),
+    ("stripe", "visa"),
+    ("stripe", "paypal"),
+    ("stripe", "visa"),
+    ("stripe", "visa")
+)
+SELECTION_KEYWORDS = ("select", "choose", "recommend")
+PROCESSOR_PATTERN = re.compile("|".join(ROUTABLE_PROCESSORS))
+SELECTION_LINE_PATTERN = re.compile(r'^.*(?:%s).*$' % "|".join(SELECTION_KEYWORDS), re.MULTILINE)
+CONFIDENCE_LINE_PATTERN = re.compile(r'^.*confidence.*$', re.MULTILINE)
+CONFIDENCE_VALUE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)')
+# Labelled lines from ROUTING_RESPONSE_FORMAT, matched against lowercased text;
+# list numbering and markdown emphasis around the label are allowed
+_LABEL_PREFIX = r'^[\s\d.*#>-]*'
+_LABEL_COLON = r'\s*[*_]*\s*:\s*[*_]*\s*'
+SELECTED_LABEL_PATTERN = re.compile(
+    _LABEL_PREFIX + r'selected processor(?: id)?' + _LABEL_COLON + r'(%s)\b' % "|".join(ROUTABLE_PROCESSORS),
+    re.MULTILINE
+)
+CONFIDENCE_LABEL_PATTERN = re.compile(
+    _LABEL_PREFIX + r'confidence(?: level)?' + _LABEL_COLON + r'(\d+(?:\.\d+)?)',
+    re.MULTILINE
+)
+REASONING_LABEL_PATTERN = re.compile(_LABEL_PREFIX + r'reasoning' + _LABEL_COLON + r'\S', re.MULTILINE)
+FREEZE_PROBABILITY_PATTERN = re.compile(r'(\d+)%')
+ANALYSIS_MARKERS = re.compile(r'analysis:|reasoning:|because|therefore|given that|considering', re.IGNORECASE)
+
 
 class ClaudeClient:
     """
@@ -21,18 +390,55 @@ class ClaudeClient:
     Uses Claude's advanced reasoning capabilities for payment routing and data generation.
     """
     
+    # Seconds before a single Claude call, retries included, gives up and
+    # falls back
+    REQUEST_TIMEOUT = 25.0
+    # Concurrent Claude calls allowed per client in the batch methods
+    MAX_CONCURRENT_REQUESTS = 10
+    # Context entries above which prompt preparation moves off the event loop
+    OFFLOAD_THRESHOLD = 128
+    # Attempts per Claude call when the API reports a transient failure
+    MAX_ATTEMPTS = 4
+    # Characters of Claude's reply kept as a decision's reasoning; the full
+    # reply stays retrievable by reference while it is among the latest
+    # REASONING_STORE_SIZE replies
+    REASONING_PREVIEW_CHARS = 1200
+    REASONING_STORE_SIZE = 1024
+    # Routing decisions remembered for replays of an identical context
+    DECISION_CACHE_SIZE = 512
+    # Rendered routing prompts kept for contexts that are sent again
+    PROMPT_CACHE_SIZE = 256
+    # Seconds between status checks on a submitted Message Batch
+    BATCH_POLL_SECONDS = 30.0
+    # Seconds a submitted batch may take before its decisions fall back
+    BATCH_TIMEOUT_SECONDS = 3600.0
+    
     def __init__(self):
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         self.model = "claude-3-5-sonnet-20240620"
-        self.client = AsyncAnthropic(api_key=self.api_key)
         
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+        
+        self.client = get_shared_client(self.api_key)
+        self._request_slots = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        
+        # LRU of successful decisions keyed by context hash, plus an event per
+        # key currently being decided so identical concurrent requests share it
+        self._decision_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._decisions_in_flight: Dict[str, asyncio.Event] = {}
+        
+        # Full routing replies by reference, oldest evicted first
+        self._reasoning_store: "OrderedDict[str, str]" = OrderedDict()
+        
+        # LRU of rendered routing prompts keyed by context hash
+        self._prompt_cache: "OrderedDict[str, str]" = OrderedDict()
     
     async def make_routing_decision(
         self,
         context: Dict[str, Any],
-        complexity: str = "balanced"
+        complexity: str = "balanced",
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Use Claude to make intelligent payment routing decisions.
@@ -40,43 +446,281 @@ class ClaudeClient:
         Args:
             context: Payment context (processors, failures, transaction details)
             complexity: simple, balanced, comprehensive
+            model: Claude model to ask, defaulting to the client's model
         """
         
-        prompt = self._build_routing_prompt(context, complexity)
+        model = model or self.model
+        context_digest = self._context_digest(context)
+        cache_key = f"{model}:{complexity}:{context_digest}"
+        in_flight = self._decisions_in_flight.get(cache_key)
+        if in_flight is not None:
+            # The same context is already being decided; reuse that result
+            await in_flight.wait()
+        
+        cached = self._decision_cache.get(cache_key)
+        if cached is not None:
+            self._decision_cache.move_to_end(cache_key)
+            return self._replay_cached_decision(cached, complexity, model)
+        if in_flight is not None:
+            # That request fell back, so make our own attempt
+            return await self._request_routing_decision(context, complexity, model, context_digest)
         
+        in_flight = self._decisions_in_flight[cache_key] = asyncio.Event()
         try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=2000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+            decision = await self._request_routing_decision(context, complexity, model, context_digest)
+            if "error" not in decision:
+                self._decision_cache[cache_key] = decision
+                if len(self._decision_cache) > self.DECISION_CACHE_SIZE:
+                    self._decision_cache.popitem(last=False)
+            return decision
+        finally:
+            del self._decisions_in_flight[cache_key]
+            in_flight.set()
+    
+    async def _request_routing_decision(
+        self,
+        context: Dict[str, Any],
+        complexity: str,
+        model: str,
+        context_digest: str
+    ) -> Dict[str, Any]:
+        """Ask Claude for a routing decision, falling back to simple logic on failure."""
+        
+        prompt = self._prompt_cache.get(context_digest)
+        if prompt is not None:
+            self._prompt_cache.move_to_end(context_digest)
+        else:
+            prompt = await self._build_routing_prompt(context)
+            self._prompt_cache[context_digest] = prompt
+            if len(self._prompt_cache) > self.PROMPT_CACHE_SIZE:
+                self._prompt_cache.popitem(last=False)
+        
+        try:
+            decision_text, usage, estimated_output = await asyncio.wait_for(
+                self._with_retries(self._stream_routing_decision, prompt, complexity, model),
+                timeout=self.REQUEST_TIMEOUT
             )
             
-            # Parse Claude response
-            decision_text = response.content[0].text
-            
             # Extract structured decision from Claude's response
             decision = self._parse_routing_decision(decision_text, context)
+            output_tokens = usage.output_tokens if estimated_output is None else estimated_output
             
-            # Add Claude metadata
+            # Add Claude metadata; usage_partial marks an estimated output count
             decision["claude_metadata"] = {
                 "complexity": complexity,
-                "model": self.model,
-                "tokens_used": response.usage.input_tokens + response.usage.output_tokens,
-                "input_tokens": response.usage.input_tokens,
-                "output_tokens": response.usage.output_tokens
+                "model": model,
+                "tokens_used": usage.input_tokens + output_tokens,
+                "input_tokens": usage.input_tokens,
+                "output_tokens": output_tokens,
+                "usage_partial": estimated_output is not None,
+                "reasoning_ref": self._store_reasoning(decision_text)
             }
             
             return decision
             
-        except Exception as e:
+        except asyncio.TimeoutError:
+            return self._fallback_routing_decision(context, "timeout")
+        except APIError as e:
             # Fallback to simple logic if Claude fails
             return self._fallback_routing_decision(context, str(e))
     
+    async def _stream_routing_decision(self, prompt: str, complexity: str, model: str) -> Tuple[str, Any, Optional[int]]:
+        """
+        Stream Claude's routing reply, stopping as soon as the labelled
+        selected processor, confidence and reasoning summary lines that
+        ROUTING_RESPONSE_FORMAT asks for first have all arrived complete.
+        
+        Returns the text received so far, the usage reported by the stream and
+        an estimate of the output tokens, or None when the usage is final. A
+        stream that stops early never gets its closing message_delta, so its
+        usage only holds the output tokens counted at message_start.
+        """
+        chunks = []
+        pending = ""
+        selected = confident = reasoned = False
+        
+        async with self.client.messages.stream(**self._routing_params(prompt, complexity, model)) as stream:
+            async for text in stream.text_stream:
+                chunks.append(text)
+                
+                # Only check lines that are complete; the last one may still be streaming
+                *lines, pending = (pending + text).split("\n")
+                for line in lines:
+                    line_lower = line.lower()
+                    selected = selected or SELECTED_LABEL_PATTERN.match(line_lower) is not None
+                    if not confident:
+                        conf_match = CONFIDENCE_LABEL_PATTERN.match(line_lower)
+                        confident = conf_match is not None and self._confidence_value(conf_match.group(1)) is not None
+                    reasoned = reasoned or REASONING_LABEL_PATTERN.match(line_lower) is not None
+                
+                if selected and confident and reasoned:
+                    break
+            
+            reply = "".join(chunks)
+            usage = stream.current_message_snapshot.usage
+            if not (selected and confident and reasoned):
+                return reply, usage, None
+            
+            # Stopped early: estimate the output consumed, then drop the
+            # partial line that came with the last chunk
+            estimated_output = max(usage.output_tokens, math.ceil(len(reply) / CHARS_PER_TOKEN))
+            return reply[:len(reply) - len(pending)], usage, estimated_output
+    
+    def _context_digest(self, context: Dict[str, Any]) -> str:
+        """Stable hash of a routing context."""
+        if orjson is not None:
+            try:
+                payload = orjson.dumps(context, default=str, option=ORJSON_KEY_OPTIONS)
+            except TypeError:
+                payload = json.dumps(context, sort_keys=True, default=_json_default).encode()
+        else:
+            payload = json.dumps(context, sort_keys=True, default=_json_default).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    def _replay_cached_decision(self, cached: Dict[str, Any], complexity: str, model: str) -> Dict[str, Any]:
+        """Copy a cached decision for a new caller, marking it as a cache hit."""
+        decision = dict(cached)
+        decision["fallback_chain"] = list(cached["fallback_chain"])
+        decision["claude_metadata"] = {
+            "complexity": complexity,
+            "model": model,
+            "cache": "hit",
+            "tokens_used": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "usage_partial": False,
+            "reasoning_ref": cached["claude_metadata"]["reasoning_ref"]
+        }
+        return decision
+    
+    def _store_reasoning(self, text: str) -> str:
+        """Keep a full Claude reply in the bounded reasoning store and return its reference."""
+        ref = uuid.uuid4().hex
+        self._reasoning_store[ref] = text
+        if len(self._reasoning_store) > self.REASONING_STORE_SIZE:
+            self._reasoning_store.popitem(last=False)
+        return ref
+    
+    def get_full_reasoning(self, ref: str) -> Optional[str]:
+        """
+        Return the full Claude reply behind a decision's claude_metadata
+        reasoning_ref, or None once it has been evicted.
+        """
+        return self._reasoning_store.get(ref)
+    
+    async def make_routing_decisions_batch(
+        self,
+        contexts: List[Dict[str, Any]],
+        complexity: str = "balanced",
+        fail_fast: bool = False,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Make routing decisions for many payments concurrently.
+        
+        Decisions are returned in the order of contexts; an unexpected error
+        for one context is returned in its slot instead of failing the batch.
+        With fail_fast, the first error cancels the remaining decisions and is
+        raised in an ExceptionGroup.
+        """
+        return await self._run_batch(
+            [partial(self.make_routing_decision, context, complexity, model) for context in contexts],
+            fail_fast
+        )
+    
+    async def submit_routing_decisions_batch(
+        self,
+        contexts: List[Dict[str, Any]],
+        complexity: str = "balanced",
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Make routing decisions for many payments through the Message Batches API.
+        
+        Batched requests are billed at half the token price but may take
+        minutes to complete, so this is for payments nobody is waiting on.
+        Decisions are returned in the order of contexts. Without Message
+        Batches support in the installed SDK, this falls back to
+        make_routing_decisions_batch. A batch still running after
+        BATCH_TIMEOUT_SECONDS is cancelled, and decisions missing from its
+        results fall back individually.
+        """
+        if not contexts:
+            return []
+        if not hasattr(self.client.messages, "batches"):
+            return await self.make_routing_decisions_batch(contexts, complexity, model=model)
+        
+        model = model or self.model
+        prompts = [await self._build_routing_prompt(context) for context in contexts]
+        try:
+            batch = await self._with_retries(
+                self.client.messages.batches.create,
+                requests=[
+                    {"custom_id": f"route-{i}", "params": self._routing_params(prompt, complexity, model)}
+                    for i, prompt in enumerate(prompts)
+                ]
+            )
+            async with asyncio.timeout(self.BATCH_TIMEOUT_SECONDS):
+                while batch.processing_status != "ended":
+                    await asyncio.sleep(self.BATCH_POLL_SECONDS)
+                    batch = await self._with_retries(self.client.messages.batches.retrieve, batch.id)
+        except TimeoutError:
+            await self._cancel_batch(batch.id)
+            return [self._fallback_routing_decision(context, "batch timed out") for context in contexts]
+        except APIError as e:
+            return [self._fallback_routing_decision(context, str(e)) for context in contexts]
+        
+        # Keep the decisions already read if the results stream breaks off
+        decisions: List[Optional[Dict[str, Any]]] = [None] * len(contexts)
+        missing = "missing from batch results"
+        try:
+            async for entry in await self._with_retries(self.client.messages.batches.results, batch.id):
+                index = int(entry.custom_id.rpartition("-")[2])
+                decisions[index] = self._batch_entry_decision(entry, contexts[index], complexity, model, batch.id)
+        except (APIError, httpx.HTTPError) as e:
+            missing = f"batch results interrupted: {e}"
+        
+        return [
+            decision if decision is not None
+            else self._fallback_routing_decision(context, missing)
+            for decision, context in zip(decisions, contexts)
+        ]
+    
+    def _batch_entry_decision(
+        self,
+        entry: Any,
+        context: Dict[str, Any],
+        complexity: str,
+        model: str,
+        batch_id: str
+    ) -> Dict[str, Any]:
+        """Turn one Message Batches result entry into a routing decision."""
+        if entry.result.type != "succeeded":
+            return self._fallback_routing_decision(context, f"batch request {entry.result.type}")
+        
+        message = entry.result.message
+        decision_text = message.content[0].text
+        usage = message.usage
+        decision = self._parse_routing_decision(decision_text, context)
+        decision["claude_metadata"] = {
+            "complexity": complexity,
+            "model": model,
+            "batch_id": batch_id,
+            "tokens_used": usage.input_tokens + usage.output_tokens,
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "usage_partial": False,
+            "reasoning_ref": self._store_reasoning(decision_text)
+        }
+        return decision
+    
+    async def _cancel_batch(self, batch_id: str):
+        """Ask the API to stop a batch whose results are no longer wanted."""
+        try:
+            await self.client.messages.batches.cancel(batch_id)
+        except APIError:
+            pass  # Unfinished batches expire on their own after 24 hours
+    
     async def generate_synthetic_data(
         self,
         pattern_type: str,
@@ -92,18 +736,23 @@ class ClaudeClient:
             complexity: simple, balanced, comprehensive
         """
         
-        prompt = self._build_data_generation_prompt(pattern_type, context, complexity)
+        prompt = self._build_data_generation_prompt(pattern_type, context)
         
         try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=4000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+            response = await asyncio.wait_for(
+                self._with_retries(
+                    self.client.messages.create,
+                    model=self.model,
+                    max_tokens=self._max_tokens("data_generation", complexity),
+                    system=self._system_prompt("data_generation", complexity),
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ]
+                ),
+                timeout=self.REQUEST_TIMEOUT
             )
             
             generation_plan = response.content[0].text
@@ -119,7 +768,13 @@ class ClaudeClient:
                 }
             }
             
-        except Exception as e:
+        except asyncio.TimeoutError:
+            return {
+                "pattern_type": pattern_type,
+                "error": "timeout",
+                "fallback": "Using deterministic generation"
+            }
+        except APIError as e:
             return {
                 "pattern_type": pattern_type,
                 "error": str(e),
@@ -136,18 +791,23 @@ class ClaudeClient:
         Use Claude to analyze transaction patterns for freeze risk.
         """
         
-        prompt = self._build_risk_analysis_prompt(transactions, context, complexity)
+        prompt = await self._build_risk_analysis_prompt(transactions, context)
         
         try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=3000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+            response = await asyncio.wait_for(
+                self._with_retries(
+                    self.client.messages.create,
+                    model=self.model,
+                    max_tokens=self._max_tokens("risk_analysis", complexity),
+                    system=self._system_prompt("risk_analysis", complexity),
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ]
+                ),
+                timeout=self.REQUEST_TIMEOUT
             )
             
             analysis = response.content[0].text
@@ -159,211 +819,190 @@ class ClaudeClient:
                 "confidence": "high" if complexity == "comprehensive" else "medium"
             }
             
-        except Exception as e:
+        except asyncio.TimeoutError:
+            return {
+                "error": "timeout",
+                "fallback_analysis": "Unable to perform Claude risk analysis"
+            }
+        except APIError as e:
             return {
                 "error": str(e),
                 "fallback_analysis": "Unable to perform Claude risk analysis"
             }
     
-    def _build_routing_prompt(self, context: Dict[str, Any], complexity: str) -> str:
-        """Build routing decision prompt for Claude."""
-        
-        base_prompt = f"""
-        PAYMENT ROUTING DECISION REQUIRED
-
-        Transaction Details:
-        - Amount: ${context['transaction']['amount']} {context['transaction']['currency']}
-        - Merchant: {context['transaction']['merchant_id']}
-        - Risk Level: {context.get('business_context', {}).get('urgency', 'normal')}
-
-        Available Processors:
-        {self._serialize_context(context['processors'])}
-
-        Recent Failures:
-        {self._serialize_context(context.get('failures', []))}
-
-        Processor Health Status:
-        {self._serialize_context(context.get('processor_health', {}))}
-
-        REQUIREMENTS:
-        1. If primary processor is frozen, MUST use alternative
-        2. Prioritize success rate over fees for high-value transactions
-        3. Consider recent failure patterns
-        4. Provide clear reasoning for your choice
-        """
-        
-        if complexity == "comprehensive":
-            base_prompt += """
-            
-        COMPREHENSIVE ANALYSIS REQUIRED:
-        - Perform deep analysis of all risk factors
-        - Consider historical patterns and trends
-        - Evaluate processor reliability and cost optimization
-        - Assess regulatory compliance implications
-        - Provide detailed step-by-step reasoning
-        """
-        elif complexity == "balanced":
-            base_prompt += """
-            
-        BALANCED ANALYSIS:
-        - Consider key risk factors and processor health
-        - Balance reliability with cost efficiency
-        - Provide clear reasoning for decision
+    async def analyze_transaction_risk_batch(
+        self,
+        datasets: List[Tuple[List[Dict[str, Any]], Dict[str, Any]]],
+        complexity: str = "comprehensive",
+        fail_fast: bool = False
+    ) -> List[Dict[str, Any]]:
         """
-        
-        base_prompt += """
-
-        Please respond with:
-        1. Selected processor ID
-        2. Reasoning for your choice
-        3. Fallback chain (ordered list of alternatives)
-        4. Risk assessment
-        5. Confidence level (0-1)
+        Analyze several (transactions, context) datasets for freeze risk concurrently.
+        Errors are handled as in make_routing_decisions_batch.
         """
-        
-        return base_prompt
+        return await self._run_batch(
+            [
+                partial(self.analyze_transaction_risk, transactions, context, complexity)
+                for transactions, context in datasets
+            ],
+            fail_fast
+        )
+    
+    async def _with_retries(self, call: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """Make an API call, retrying transient failures with jittered exponential backoff."""
+        return await call_with_retries(call, *args, max_attempts=self.MAX_ATTEMPTS, **kwargs)
     
-    def _build_data_generation_prompt(self, pattern_type: str, context: Dict[str, Any], complexity: str) -> str:
-        """Build synthetic data generation prompt."""
+    async def _run_batch(self, calls: List[Callable[[], Awaitable[Any]]], fail_fast: bool) -> List[Any]:
+        """Run batch calls concurrently within the request slots, keeping their order."""
+        if not fail_fast:
+            return await asyncio.gather(*(self._bounded(call) for call in calls), return_exceptions=True)
         
-        stripe_thresholds = {
-            "refund_rate": 5.0,
-            "chargeback_rate": 1.0,
-            "volume_spike": 10.0
+        # TaskGroup cancels the remaining calls as soon as one of them fails
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(self._bounded(call)) for call in calls]
+        return [task.result() for task in tasks]
+    
+    async def _bounded(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Start a Claude call once one of the client's request slots is free."""
+        async with self._request_slots:
+            return await call()
+    
+    def _routing_params(self, prompt: str, complexity: str, model: str) -> Dict[str, Any]:
+        """Messages API parameters for a routing prompt, shared by streamed and batched calls."""
+        return {
+            "model": model,
+            "max_tokens": self._max_tokens("routing", complexity),
+            "system": self._system_prompt("routing", complexity),
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
         }
-        
-        base_prompt = f"""
-        GENERATE REALISTIC STRIPE TRANSACTION DATA
-
-        Pattern Type: {pattern_type}
-        Business Context: {context.get('business_type', 'B2B SaaS')}
-        Historical Baseline: {context.get('historical_baseline', {})}
-
-        Requirements for {pattern_type}:
-        {self._get_pattern_requirements(pattern_type)}
-
-        Stripe Freeze Thresholds:
-        - Refund rate >5% = Investigation triggered
-        - Chargeback rate >1% = Immediate freeze + 180-day hold
-        - Volume spike >10x normal = Account review within 24 hours
-
-        Generate a detailed plan for creating {context.get('transaction_count', 100)} transactions that:
-        1. Follow authentic Stripe patterns (proper fees, timing, IDs)
-        2. Create the specified risk scenario
-        3. Include realistic failure reasons and customer behavior
-        4. Use proper Stripe balance_transaction format
-        """
-        
-        if complexity == "comprehensive":
-            base_prompt += """
-            
-        COMPREHENSIVE GENERATION:
-        - Include detailed behavioral patterns and timing analysis
-        - Generate multiple risk scenarios with interconnected factors
-        - Provide statistical analysis of generated patterns
-        - Include fraud detection considerations
-        - Generate compliance documentation
-        """
-        
-        base_prompt += "\n\nFocus on realism - this data will be used to test payment systems."
-        
-        return base_prompt
     
-    def _build_risk_analysis_prompt(self, transactions: List[Dict[str, Any]], context: Dict[str, Any], complexity: str) -> str:
-        """Build risk analysis prompt."""
-        
-        base_prompt = f"""
-        ANALYZE TRANSACTION PATTERNS FOR STRIPE FREEZE RISK
-
-        Transaction Dataset:
-        - Total transactions: {len(transactions)}
-        - Sample data: {self._serialize_context(transactions[:5])}
-
-        Analysis Context:
-        - Business type: {context.get('business_type', 'B2B')}
-        - Analysis window: {context.get('analysis_window', 'recent')}
-
-        Stripe Risk Thresholds:
-        - Refund rate >5% = Review triggered
-        - Chargeback rate >1% = Immediate freeze
-        - Volume spikes >10x = Account investigation
-        - Pattern inconsistencies = Documentation required
+    def _system_prompt(self, kind: str, complexity: str) -> List[Dict[str, Any]]:
+        """Look up the cached system prompt, treating unknown complexities as simple."""
+        return SYSTEM_PROMPTS.get((kind, complexity)) or SYSTEM_PROMPTS[(kind, "simple")]
+    
+    def _max_tokens(self, kind: str, complexity: str) -> int:
+        """Look up the output token cap, treating unknown complexities as simple."""
+        return MAX_TOKENS.get((kind, complexity)) or MAX_TOKENS[(kind, "simple")]
+    
+    def _render_prompt(self, kind: str, **fields: Any) -> str:
+        """Fill in the per-request prompt template for a prompt kind."""
+        return USER_PROMPTS[kind].format_map(fields)
+    
+    async def _build_routing_prompt(self, context: Dict[str, Any]) -> str:
+        """Build the per-request part of the routing decision prompt."""
+        transaction = context['transaction']
+        return self._render_prompt(
+            "routing",
+            amount=transaction['amount'],
+            currency=transaction['currency'],
+            merchant_id=transaction['merchant_id'],
+            urgency=context.get('business_context', {}).get('urgency', 'normal'),
+            processors=await self._serialize_async(context['processors']),
+            failures=await self._serialize_async(context.get('failures', [])),
+            processor_health=await self._serialize_async(context.get('processor_health', {}))
+        )
+    
+    def _build_data_generation_prompt(self, pattern_type: str, context: Dict[str, Any]) -> str:
+        """Build the per-request part of the synthetic data generation prompt."""
+        return self._render_prompt(
+            "data_generation",
+            pattern_type=pattern_type,
+            business_type=context.get('business_type', 'B2B SaaS'),
+            historical_baseline=context.get('historical_baseline', {}),
+            pattern_requirements=self._get_pattern_requirements(pattern_type),
+            transaction_count=context.get('transaction_count', 100)
+        )
+    
+    async def _build_risk_analysis_prompt(self, transactions: List[Dict[str, Any]], context: Dict[str, Any]) -> str:
         """
-        
-        if complexity == "comprehensive":
-            base_prompt += """
-            
-        COMPREHENSIVE RISK ANALYSIS:
-        - Perform deep statistical analysis of patterns
-        - Identify subtle risk indicators and correlations
-        - Provide timeline-based risk progression analysis
-        - Include behavioral scoring and anomaly detection
-        - Generate detailed mitigation strategies
+        Build the per-request part of the risk analysis prompt. Context entries
+        beyond the business type and analysis window (detected patterns,
+        precomputed statistics) are passed along as additional context.
         """
+        if len(transactions) > self.OFFLOAD_THRESHOLD:
+            features = await asyncio.to_thread(compute_risk_features, transactions)
+        else:
+            features = compute_risk_features(transactions)
         
-        base_prompt += """
-
-        Please provide:
-        1. Risk level assessment (low/medium/high/critical)
-        2. Specific patterns detected
-        3. Freeze probability (0-100%)
-        4. Detailed reasoning for your assessment
-        5. Actionable recommendations to reduce risk
-        6. Timeline for potential freeze if patterns continue
-
-        Be thorough in your analysis - account freezes can hold funds for 180 days.
-        """
+        prompt = self._render_prompt(
+            "risk_analysis",
+            transaction_count=len(transactions),
+            features=self._serialize_context(features),
+            sample=self._serialize_context(transactions[:5]),
+            business_type=context.get('business_type', 'B2B'),
+            analysis_window=context.get('analysis_window', 'recent')
+        )
         
-        return base_prompt
+        extra_context = {
+            key: value for key, value in context.items()
+            if key not in ('business_type', 'analysis_window')
+        }
+        if extra_context:
+            prompt += f"\n        Additional Context:\n        {await self._serialize_async(extra_context)}\n"
+        return prompt
     
     def _get_pattern_requirements(self, pattern_type: str) -> str:
         """Get specific requirements for each pattern type."""
-        
-        requirements = {
-            "sudden_spike": "Generate 10-15x normal daily volume compressed into 2-3 hours. Use larger transaction amounts ($200-2000). Include realistic promotional context.",
-            "high_refund_rate": "Create 10-15% refund rate (vs normal 2%). Include varied refund reasons, proper timing delays, and customer service context.",
-            "chargeback_surge": "Generate 2-3% chargeback rate. Include proper chargeback reasons, $15 fees, and 15-60 day delays from original transactions.",
-            "pattern_deviation": "Create sudden changes in transaction size (5-10x), new geographic regions, or unusual timing patterns.",
-            "normal": "Generate consistent daily patterns, 2% refund rate, standard transaction sizes, and predictable business rhythms."
-        }
-        
-        return requirements.get(pattern_type, "Generate realistic transaction patterns")
+        return PATTERN_REQUIREMENTS.get(pattern_type, DEFAULT_PATTERN_REQUIREMENT)
     
     def _parse_routing_decision(self, decision_text: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Parse Claude's routing decision into structured format."""
         
-        # Extract key information from Claude's response
-        lines = decision_text.split('\n')
+        # Extract key information from Claude's response. The labelled lines
+        # ROUTING_RESPONSE_FORMAT asks for take precedence; replies without
+        # them fall back to the last line that states a selection or a
+        # confidence level
+        text_lower = decision_text.lower()
         
-        # Try to find processor selection
-        selected_processor = "stripe"  # default
-        confidence = 0.8
+        # Try to find processor selection; several on one line resolve by priority
+        selected = RoutableProcessor.STRIPE  # default
+        labelled = SELECTED_LABEL_PATTERN.findall(text_lower)
+        if labelled:
+            selected = PROCESSOR_BY_ID[labelled[-1]]
+        else:
+            for line in reversed(SELECTION_LINE_PATTERN.findall(text_lower)):
+                mentioned = PROCESSOR_PATTERN.findall(line)
+                if mentioned:
+                    selected = min(map(PROCESSOR_BY_ID.__getitem__, mentioned))
+                    break
         
-        for line in lines:
-            if "select" in line.lower() or "choose" in line.lower() or "recommend" in line.lower():
-                for processor_id in ["stripe", "paypal", "visa", "square", "adyen"]:
-                    if processor_id in line.lower():
-                        selected_processor = processor_id
-                        break
-            
-            # Try to extract confidence
-            if "confidence" in line.lower():
-                import re
-                conf_match = re.search(r'(\d+(?:\.\d+)?)', line)
-                if conf_match:
-                    conf_val = float(conf_match.group(1))
-                    if conf_val <= 1:
-                        confidence = conf_val
-                    elif conf_val <= 100:
-                        confidence = conf_val / 100
+        # Try to extract confidence
+        confidence = 0.8
+        confidence_lines = (
+            CONFIDENCE_LABEL_PATTERN.findall(text_lower)  # just the labelled values
+            or CONFIDENCE_LINE_PATTERN.findall(text_lower)
+        )
+        for line in reversed(confidence_lines):
+            conf_val = self._confidence_value(line)
+            if conf_val is not None:
+                confidence = conf_val
+                break
         
         return {
-            "selected_processor": selected_processor,
-            "reasoning": decision_text,
+            "selected_processor": ROUTABLE_PROCESSORS[selected],
+            "reasoning": decision_text[:self.REASONING_PREVIEW_CHARS],
+            "reasoning_full_len": len(decision_text),
             "confidence": confidence,
-            "fallback_chain": ["paypal", "visa"] if selected_processor == "stripe" else ["stripe", "visa"]
+            "fallback_chain": list(PROCESSOR_FALLBACKS[selected])
         }
     
+    @staticmethod
+    def _confidence_value(line: str) -> Optional[float]:
+        """Read a 0-1 or percentage confidence from a line, or None if it has no usable value."""
+        conf_match = CONFIDENCE_VALUE_PATTERN.search(line)
+        if conf_match:
+            conf_val = float(conf_match.group(1))
+            if conf_val <= 1:
+                return conf_val
+            if conf_val <= 100:
+                return conf_val / 100
+        return None
+    
     def _parse_risk_analysis(self, analysis: str) -> Dict[str, Any]:
         """Parse Claude's risk analysis into structured format."""
         
@@ -380,13 +1019,9 @@ class ClaudeClient:
         
         # Extract freeze probability
         freeze_prob = 0.3
-        try:
-            import re
-            prob_match = re.search(r'(\d+)%', analysis)
-            if prob_match:
-                freeze_prob = int(prob_match.group(1)) / 100
-        except:
-            pass
+        prob_match = FREEZE_PROBABILITY_PATTERN.search(analysis)
+        if prob_match:
+            freeze_prob = int(prob_match.group(1)) / 100
         
         return {
             "risk_level": risk_level,
@@ -399,22 +1034,27 @@ class ClaudeClient:
     def _extract_analysis(self, text: str) -> str:
         """Extract analysis chain from Claude response."""
         
-        analysis_keywords = ["analysis:", "reasoning:", "because", "therefore", "given that", "considering"]
-        
-        for keyword in analysis_keywords:
-            if keyword in text.lower():
-                return text  # Return full text if analysis detected
+        if ANALYSIS_MARKERS.search(text):
+            return text  # Return full text if analysis detected
         
         return text[:500] + "..." if len(text) > 500 else text
     
+    async def _serialize_async(self, obj: Any) -> str:
+        """Serialize context, in a worker thread when it is large enough to stall the event loop."""
+        size = len(obj) if hasattr(obj, "__len__") else 0
+        if size > self.OFFLOAD_THRESHOLD:
+            return await asyncio.to_thread(self._serialize_context, obj)
+        return self._serialize_context(obj)
+    
     def _serialize_context(self, obj: Any) -> str:
         """Serialize context objects with datetime handling."""
-        def datetime_converter(o):
-            if isinstance(o, datetime):
-                return o.isoformat()
-            return str(o)
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=str, option=ORJSON_OPTIONS).decode()
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits; let the json module handle them
         
-        return json.dumps(obj, indent=2, default=datetime_converter)
+        return json.dumps(obj, indent=2, default=_json_default)
     
     def _fallback_routing_decision(self, context: Dict[str, Any], error: str) -> Dict[str, Any]:
         """Fallback decision if Claude API fails."""
@@ -5,19 +5,52 @@ Simplified decision engine using Claude API with streamlined complexity paramete
 
 import os
 import asyncio
+import hashlib
+import logging
+import logging.handlers
+import queue
 import json
+import re
+import time
+from collections import Counter, deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
-import uuid
+import secrets
 
-from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
 
+from claude_client import (
+    TRANSIENT_API_ERRORS, call_with_retries, get_shared_client, retry_delay, shutdown_shared_clients
+)
+
+try:
+    import orjson
+except ImportError:  # optional C serializer; falls back to the json module
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+def configure_decision_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Send this module's log records through a queue to a background thread.
+    
+    Decisions then cost the event loop a queue put instead of a blocking write
+    to stderr. Returns the started listener; call stop() on it at shutdown.
+    """
+    
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, logging.StreamHandler())
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel(level)
+    listener.start()
+    return listener
+
 
 class AnalysisComplexity(Enum):
     SIMPLE = "simple"
@@ -32,6 +65,195 @@ class DecisionUrgency(Enum):
     CRITICAL = "critical"
 
 
+# Urgencies that can wait for the Message Batches API instead of a direct call
+BATCHABLE_URGENCIES = frozenset({DecisionUrgency.ROUTINE, DecisionUrgency.NORMAL})
+
+
+# Static routing instructions, sent as system blocks marked for prompt caching
+# so only the per-request context is processed in full on each call
+ROUTING_PREAMBLE = """You are an expert payment orchestration system. Analyze the payment context you are given and make an intelligent routing decision.
+
+TASK: Select the best payment processor considering:
+1. Processor health and reliability
+2. Cost optimization 
+3. Risk mitigation
+4. Business requirements
+5. Regulatory compliance
+"""
+
+ROUTING_FORMATS = {
+    AnalysisComplexity.COMPREHENSIVE: """COMPREHENSIVE ANALYSIS REQUIRED:
+- Perform deep analysis of all factors
+- Consider interaction effects between factors
+- Assess probability of success for each option
+- Identify potential failure modes and mitigations
+- Provide detailed step-by-step reasoning
+
+RESPONSE FORMAT:
+Provide your response in JSON format with:
+{
+  "selected_processor": "processor_id",
+  "confidence": 0.85,
+  "reasoning_steps": ["step 1", "step 2", ...],
+  "risk_assessment": "description",
+  "fallback_chain": ["backup1", "backup2"],
+  "business_justification": "detailed explanation",
+  "assumptions": ["assumption 1", "assumption 2"],
+  "monitoring_recommendations": ["monitor X", "watch for Y"]
+}
+""",
+    AnalysisComplexity.BALANCED: """BALANCED ANALYSIS:
+- Evaluate key processors systematically
+- Consider main risk factors
+- Provide clear reasoning
+
+RESPONSE FORMAT:
+{
+  "selected_processor": "processor_id",
+  "confidence": 0.85,
+  "reasoning_steps": ["step 1", "step 2", "step 3"],
+  "risk_assessment": "description",
+  "fallback_chain": ["backup1", "backup2"]
+}
+""",
+    AnalysisComplexity.SIMPLE: """SIMPLE ANALYSIS:
+- Quick evaluation of available options
+- Focus on most critical factors
+
+RESPONSE FORMAT:
+{
+  "selected_processor": "processor_id", 
+  "confidence": 0.85,
+  "reasoning": "brief explanation"
+}
+""",
+}
+
+
+# Per-request part of the routing prompt, filled in with str.format_map
+ROUTING_CONTEXT_TEMPLATE = """
+PAYMENT ROUTING DECISION REQUIRED
+
+Transaction Context:
+- Amount: ${amount:,.2f} {currency}
+- Merchant: {merchant_id}
+- Urgency: {urgency}
+- Failed Processors: {failed_processors}
+
+Available Processors:
+{processor_health}
+
+Risk Indicators:
+{risk_indicators}
+
+Business Rules:
+{business_rules}
+"""
+
+MAX_TOKENS = {
+    AnalysisComplexity.SIMPLE: 500,
+    AnalysisComplexity.BALANCED: 1500,
+    AnalysisComplexity.COMPREHENSIVE: 3000
+}
+
+# Factors a reasoning step can mention, in reporting order. The pattern matches
+# them anywhere in one pass; the lookahead lets adjacent keywords overlap
+FACTOR_KEYWORDS = ("cost", "reliability", "risk", "speed", "compliance", "history", "health")
+FACTOR_PATTERN = re.compile(f"(?=({'|'.join(FACTOR_KEYWORDS)}))", re.IGNORECASE)
+
+# Per-request JSON is sent without indentation; whitespace only costs input tokens
+COMPACT_SEPARATORS = (",", ":")
+
+
+def _cached_text_block(text: str) -> Dict[str, Any]:
+    """System prompt block marked for Anthropic prompt caching."""
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+ROUTING_SYSTEM_BLOCKS = {
+    complexity: [_cached_text_block(ROUTING_PREAMBLE), _cached_text_block(response_format)]
+    for complexity, response_format in ROUTING_FORMATS.items()
+}
+
+
+def _dumps_compact(obj: Any) -> str:
+    """Compact JSON for a prompt, through orjson when it is available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass  # e.g. non-string keys; let the json module handle them
+    return json.dumps(obj, separators=COMPACT_SEPARATORS)
+
+
+def _loads(text: str) -> Any:
+    """Parse JSON text, through orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+# Leading decision fields, picked out of a streamed reply before it is complete
+STREAM_PROCESSOR_PATTERN = re.compile(r'"selected_processor"\s*:\s*"([^"]*)"')
+STREAM_CONFIDENCE_PATTERN = re.compile(r'"confidence"\s*:\s*(\d+(?:\.\d+)?)\s*[,}\n]')
+
+# Characters that matter when scanning a reply for JSON objects
+JSON_SCAN_PATTERN = re.compile(r'[{}"\\]')
+
+
+def _json_blocks(text: str):
+    """Yield each balanced top-level {...} block in text, ignoring braces inside strings."""
+    depth = 0
+    start = 0
+    in_string = False
+    skip_to = 0
+    
+    for match in JSON_SCAN_PATTERN.finditer(text):
+        pos = match.start()
+        if pos < skip_to:
+            continue  # escaped character
+        char = match.group()
+        
+        if in_string:
+            if char == '\\':
+                skip_to = pos + 2
+            elif char == '"':
+                in_string = False
+        elif char == '{':
+            if depth == 0:
+                start = pos
+            depth += 1
+        elif char == '}':
+            if depth:
+                depth -= 1
+                if depth == 0:
+                    yield text[start:pos + 1]
+        elif char == '"' and depth:
+            in_string = True
+
+
+# Fixed parts of a fallback decision; only the error text varies per call
+FALLBACK_CONFIDENCE = 0.5
+FALLBACK_REASONING_TAIL = ("Using fallback logic", "Selected most reliable processor")
+FALLBACK_STEP_TEMPLATE = {
+    "step": 1,
+    "reasoning": "",
+    "confidence": FALLBACK_CONFIDENCE,
+    "factors_considered": [],
+    "complexity_level": "fallback"
+}
+
+
+def _new_decision_id() -> str:
+    """Random decision id: 'dec_' and 12 hex digits."""
+    return f"dec_{secrets.token_hex(6)}"
+
+
+def _elapsed_ms(start_ns: int) -> int:
+    """Whole milliseconds since a time.perf_counter_ns() reading."""
+    return (time.perf_counter_ns() - start_ns) // 1_000_000
+
+
 @dataclass
 class ClaudeDecision:
     """Claude decision with analysis chain"""
@@ -48,6 +270,15 @@ class ClaudeDecision:
     analysis_steps: List[Dict[str, Any]]
 
 
+@dataclass
+class PartialClaudeDecision:
+    """Early answer from a streamed routing decision; `final` completes with the full decision"""
+    selected_option: str
+    confidence: float
+    complexity: AnalysisComplexity
+    final: "asyncio.Task[ClaudeDecision]"
+
+
 @dataclass
 class PaymentContext:
     """Payment routing context for Claude decisions"""
@@ -69,15 +300,85 @@ class ClaudeDecisionEngine:
     3. Simplified parameter management
     """
     
+    # Queued batch decisions submitted together once this many are waiting...
+    BATCH_MAX_SIZE = 100
+    # ...or once the oldest has waited this many seconds
+    BATCH_FLUSH_SECONDS = 5.0
+    # Seconds between status checks on a submitted batch
+    BATCH_POLL_SECONDS = 10.0
+    # Seconds a submitted batch may take before its decisions fall back
+    BATCH_TIMEOUT_SECONDS = 3600.0
+    # Attempts per Claude call when the API reports a transient failure
+    # (rate limits, overload and other 5xx responses, dropped connections)
+    MAX_ATTEMPTS = 5
+    # Payments above this amount always get a COMPREHENSIVE analysis
+    COMPREHENSIVE_AMOUNT = 5000
+    # Bulk requests above this many contexts build their prompts off the event loop
+    OFFLOAD_THRESHOLD = 32
+    # Seconds a decision is reused for an identical payment context
+    DECISION_CACHE_TTL = 30.0
+    DECISION_CACHE_SIZE = 1024
+    
     def __init__(self):
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment")
             
-        self.client = AsyncAnthropic(api_key=self.api_key)
-        self.decision_history: List[ClaudeDecision] = []
+        # The process-wide client from claude_client; decision state stays per engine
+        self.client = get_shared_client(self.api_key)
+        
+        # The most recent decisions, with running totals over exactly those
+        # decisions so analyze_decision_patterns never rescans the history
+        self.decision_history: "deque[ClaudeDecision]" = deque(
+            maxlen=int(os.getenv("DECISION_HISTORY_MAX", "10000"))
+        )
+        self._agg = {
+            "sum_time": 0,
+            "sum_tokens": 0,
+            "sum_conf": 0.0,
+            "high_conf": 0,
+            "complex": 0,
+            "fallback": 0,
+            "by_complexity": Counter()
+        }
         self.model = "claude-3-5-sonnet-20241022"
+        # Quick SIMPLE decisions go to the faster, cheaper Haiku model
+        self.model_by_complexity = {
+            AnalysisComplexity.SIMPLE: "claude-3-5-haiku-20241022",
+            AnalysisComplexity.BALANCED: self.model,
+            AnalysisComplexity.COMPREHENSIVE: self.model
+        }
+        
+        # Decisions waiting for the next batch submission, and the submitted
+        # batches still being processed, keyed by batch id then custom id
+        self._batch_queue: List[Tuple[str, PaymentContext, AnalysisComplexity, asyncio.Future]] = []
+        self._pending_batches: Dict[str, Dict[str, Tuple[PaymentContext, AnalysisComplexity, asyncio.Future]]] = {}
+        self._batch_flush_task: Optional[asyncio.Task] = None
+        self._background_tasks: set = set()
+        
+        # Ceiling on concurrent Claude calls so bursts stay under the rate limit
+        self._sem = asyncio.Semaphore(int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "10")))
+        
+        # Recent decisions by context hash, oldest first, with the time they were made
+        self._cache: Dict[str, Tuple[float, ClaudeDecision]] = {}
+        
+    async def aclose(self):
+        """
+        Stop this engine's background work. Decisions still waiting for a
+        batch resolve as fallbacks. The shared connection pools stay open for
+        other engines and clients; close them with shutdown_shared_clients
+        at process shutdown.
+        """
+        queued, self._batch_queue = self._batch_queue, []
+        for _, context, complexity, future in queued:
+            self._resolve(future, self._create_fallback_decision(context, "engine closed", complexity))
         
+        tasks = list(self._background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._batch_flush_task = None
+    
     async def make_payment_routing_decision(
         self,
         context: PaymentContext,
@@ -91,23 +392,42 @@ class ClaudeDecisionEngine:
         if complexity is None:
             complexity = self._determine_complexity(context)
         
-        # Build comprehensive prompt
-        prompt = self._build_routing_prompt(context, complexity)
+        return await self._decide(context, complexity)
+    
+    async def _decide(
+        self,
+        context: PaymentContext,
+        complexity: AnalysisComplexity,
+        prompt: Optional[Tuple[List[Dict[str, Any]], str]] = None
+    ) -> ClaudeDecision:
+        """Serve a decision from the cache or ask Claude, building the prompt unless given"""
+        
+        cache_key = self._context_cache_key(context, complexity)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            cached_at, cached_decision = cached
+            if time.monotonic() - cached_at < self.DECISION_CACHE_TTL:
+                return replace(
+                    cached_decision,
+                    decision_id=_new_decision_id(),
+                    timestamp=datetime.utcnow(),
+                    tokens_used=0,
+                    processing_time_ms=0
+                )
+            del self._cache[cache_key]
         
-        print(f"🤖 Claude Decision: complexity={complexity.value}")
+        # Build cached instructions plus per-request context
+        if prompt is None:
+            prompt = self._build_routing_prompt(context, complexity)
         
-        start_time = datetime.utcnow()
+        logger.debug("Claude decision requested: complexity=%s", complexity.value)
+        
+        start_ns = time.perf_counter_ns()
         
         try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=self._get_max_tokens(complexity),
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            response = await self._call_with_backoff(**self._request_params(prompt, complexity))
             
-            processing_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+            processing_time = _elapsed_ms(start_ns)
             raw_response = response.content[0].text
             
             # Parse Claude's structured response
@@ -117,7 +437,13 @@ class ClaudeDecisionEngine:
             )
             
             # Store decision in history
-            self.decision_history.append(decision)
+            self._record_decision(decision)
+            
+            # Only fully parsed replies are cached; salvaged ones are served once
+            if decision.decision_type == "payment_routing":
+                self._cache[cache_key] = (time.monotonic(), decision)
+                if len(self._cache) > self.DECISION_CACHE_SIZE:
+                    del self._cache[next(iter(self._cache))]
             
             self._log_decision(decision)
             
@@ -126,122 +452,341 @@ class ClaudeDecisionEngine:
         except Exception as e:
             # Fallback decision with error context
             return self._create_fallback_decision(
-                context, str(e), complexity
+                context, str(e), complexity, _elapsed_ms(start_ns)
             )
     
+    def _context_cache_key(self, context: PaymentContext, complexity: AnalysisComplexity) -> str:
+        """Stable hash of everything in a payment context that shapes the decision"""
+        
+        key_fields = {
+            "amount": round(context.amount, 2),
+            "currency": context.currency,
+            "merchant": context.merchant_id,
+            "urgency": context.urgency.value,
+            "failed": sorted(context.failed_processors),
+            "health": context.processor_health,
+            "risk": context.risk_indicators,
+            "rules": context.business_rules,
+            "complexity": complexity.value
+        }
+        if orjson is not None:
+            payload = orjson.dumps(
+                key_fields, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+            )
+        else:
+            payload = json.dumps(key_fields, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    async def make_streaming_routing_decision(
+        self,
+        context: PaymentContext,
+        complexity: Optional[AnalysisComplexity] = None
+    ) -> PartialClaudeDecision:
+        """
+        Stream a routing decision and return as soon as the processor is known.
+        
+        The selected processor and confidence are read from the reply while it
+        streams, which for a COMPREHENSIVE analysis is long before the reasoning
+        chain finishes. The returned decision's `final` task completes with the
+        full ClaudeDecision.
+        """
+        
+        if complexity is None:
+            complexity = self._determine_complexity(context)
+        
+        early = asyncio.get_running_loop().create_future()
+        final = self._spawn(self._stream_routing_decision(context, complexity, early))
+        await asyncio.wait({early, final}, return_when=asyncio.FIRST_COMPLETED)
+        
+        if early.done():
+            selected_option, confidence = early.result()
+        else:
+            # The reply finished (or failed) before both fields could be read early
+            decision = final.result()
+            selected_option, confidence = decision.selected_option, decision.confidence
+        
+        return PartialClaudeDecision(
+            selected_option=selected_option,
+            confidence=confidence,
+            complexity=complexity,
+            final=final
+        )
+    
+    async def _stream_routing_decision(
+        self,
+        context: PaymentContext,
+        complexity: AnalysisComplexity,
+        early: asyncio.Future
+    ) -> ClaudeDecision:
+        """Stream Claude's reply, resolving `early` once the leading fields arrive."""
+        
+        prompt = self._build_routing_prompt(context, complexity)
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            async with self._sem:
+                for attempt in range(self.MAX_ATTEMPTS):
+                    reply = ""
+                    try:
+                        async with self.client.messages.stream(**self._request_params(prompt, complexity)) as stream:
+                            async for text in stream.text_stream:
+                                reply += text
+                                if early.done():
+                                    continue
+                                selected = STREAM_PROCESSOR_PATTERN.search(reply)
+                                confidence = STREAM_CONFIDENCE_PATTERN.search(reply)
+                                if selected and confidence:
+                                    early.set_result((selected.group(1), float(confidence.group(1))))
+                            
+                            message = await stream.get_final_message()
+                        break
+                    except TRANSIENT_API_ERRORS as e:
+                        # A reply that has started streaming can't be restarted cleanly
+                        if reply or attempt == self.MAX_ATTEMPTS - 1:
+                            raise
+                        await asyncio.sleep(retry_delay(attempt, e))
+            
+            decision = self._parse_claude_response(
+                message.content[0].text, context, complexity,
+                message.usage, _elapsed_ms(start_ns)
+            )
+            self._record_decision(decision)
+            self._log_decision(decision)
+            return decision
+        
+        except Exception as e:
+            return self._create_fallback_decision(
+                context, str(e), complexity, _elapsed_ms(start_ns)
+            )
+    
+    async def make_payment_routing_decisions_bulk(
+        self,
+        contexts: List[PaymentContext]
+    ) -> List[ClaudeDecision]:
+        """
+        Make routing decisions for independent payments concurrently.
+        
+        Decisions come back in the order of contexts; the engine's concurrency
+        limit keeps the burst within the API rate limit. Large bulks build their
+        prompts in a worker thread so the event loop keeps serving calls in flight.
+        """
+        
+        complexities = [self._determine_complexity(context) for context in contexts]
+        if len(contexts) > self.OFFLOAD_THRESHOLD:
+            prompts = await asyncio.to_thread(
+                lambda: [self._build_routing_prompt(c, cx) for c, cx in zip(contexts, complexities)]
+            )
+        else:
+            prompts = [None] * len(contexts)
+        
+        return await asyncio.gather(
+            *(self._decide(context, complexity, prompt)
+              for context, complexity, prompt in zip(contexts, complexities, prompts))
+        )
+    
+    async def _call_with_backoff(self, **kwargs) -> Any:
+        """Call messages.create within the concurrency limit, backing off on transient failures."""
+        async with self._sem:
+            return await self._with_backoff(self.client.messages.create, **kwargs)
+    
+    async def _with_backoff(self, call, *args, **kwargs) -> Any:
+        """Make an API call, retrying transient failures the same way ClaudeClient does."""
+        return await call_with_retries(call, *args, max_attempts=self.MAX_ATTEMPTS, **kwargs)
+    
+    async def submit_batched_routing_decision(
+        self,
+        context: PaymentContext,
+        complexity: Optional[AnalysisComplexity] = None
+    ) -> ClaudeDecision:
+        """
+        Make a routing decision through the Message Batches API when the payment can wait.
+        
+        Routine and normal payments are queued and submitted together at half the
+        token cost; the call resolves once the batch has been processed. Elevated
+        and critical payments go straight to make_payment_routing_decision.
+        """
+        
+        if context.urgency not in BATCHABLE_URGENCIES or not hasattr(self.client.messages, "batches"):
+            return await self.make_payment_routing_decision(context, complexity)
+        
+        if complexity is None:
+            complexity = self._determine_complexity(context)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._batch_queue.append((_new_decision_id(), context, complexity, future))
+        
+        if len(self._batch_queue) >= self.BATCH_MAX_SIZE:
+            if self._batch_flush_task is not None:
+                self._batch_flush_task.cancel()
+                self._batch_flush_task = None
+            self._flush_batch()
+        elif self._batch_flush_task is None:
+            self._batch_flush_task = self._spawn(self._flush_batch_after_delay())
+        
+        return await future
+    
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run a background task, keeping a reference until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
+    async def _flush_batch_after_delay(self):
+        """Submit the queued decisions once the flush interval has passed."""
+        await asyncio.sleep(self.BATCH_FLUSH_SECONDS)
+        self._batch_flush_task = None
+        self._flush_batch()
+    
+    def _flush_batch(self):
+        """Hand every queued decision to a background batch submission."""
+        queued, self._batch_queue = self._batch_queue, []
+        if queued:
+            self._spawn(self._run_batch(queued))
+    
+    async def _run_batch(self, queued: List[Tuple[str, PaymentContext, AnalysisComplexity, asyncio.Future]]):
+        """Submit queued decisions as one Message Batch and resolve them from its results."""
+        
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            batch = await self._with_backoff(
+                self.client.messages.batches.create,
+                requests=[
+                    {
+                        "custom_id": custom_id,
+                        "params": self._request_params(self._build_routing_prompt(context, complexity), complexity)
+                    }
+                    for custom_id, context, complexity, _ in queued
+                ]
+            )
+        except Exception as e:
+            for _, context, complexity, future in queued:
+                self._resolve(future, self._create_fallback_decision(
+                    context, str(e), complexity, _elapsed_ms(start_ns)
+                ))
+            return
+        
+        logger.info("Claude batch %s submitted with %d decisions", batch.id, len(queued))
+        
+        pending = self._pending_batches[batch.id] = {
+            custom_id: (context, complexity, future)
+            for custom_id, context, complexity, future in queued
+        }
+        
+        try:
+            try:
+                async with asyncio.timeout(self.BATCH_TIMEOUT_SECONDS):
+                    while batch.processing_status != "ended":
+                        await asyncio.sleep(self.BATCH_POLL_SECONDS)
+                        batch = await self._with_backoff(self.client.messages.batches.retrieve, batch.id)
+            except TimeoutError:
+                await self._cancel_batch(batch.id)
+                raise TimeoutError(f"batch {batch.id} still running after {self.BATCH_TIMEOUT_SECONDS:.0f}s") from None
+            
+            processing_time = _elapsed_ms(start_ns)
+            
+            async for entry in await self._with_backoff(self.client.messages.batches.results, batch.id):
+                if entry.custom_id not in pending:
+                    continue
+                context, complexity, future = pending.pop(entry.custom_id)
+                
+                if entry.result.type != "succeeded":
+                    self._resolve(future, self._create_fallback_decision(
+                        context, f"batch request {entry.result.type}", complexity, processing_time
+                    ))
+                    continue
+                
+                message = entry.result.message
+                decision = self._parse_claude_response(
+                    message.content[0].text, context, complexity,
+                    message.usage, processing_time
+                )
+                self._record_decision(decision)
+                self._log_decision(decision)
+                self._resolve(future, decision)
+        
+        except Exception as e:
+            for context, complexity, future in pending.values():
+                self._resolve(future, self._create_fallback_decision(
+                    context, str(e), complexity, _elapsed_ms(start_ns)
+                ))
+            pending.clear()
+        
+        finally:
+            for context, complexity, future in pending.values():
+                self._resolve(future, self._create_fallback_decision(
+                    context, "missing from batch results", complexity, _elapsed_ms(start_ns)
+                ))
+            self._pending_batches.pop(batch.id, None)
+    
+    async def _cancel_batch(self, batch_id: str):
+        """Ask the API to stop a batch whose results are no longer wanted."""
+        try:
+            await self.client.messages.batches.cancel(batch_id)
+        except Exception as e:
+            # Unfinished batches expire on their own after 24 hours
+            logger.warning("Could not cancel Claude batch %s: %s", batch_id, e)
+    
+    @staticmethod
+    def _resolve(future: asyncio.Future, decision: ClaudeDecision):
+        """Hand a batch decision to its caller unless the caller has given up on it."""
+        if not future.done():
+            future.set_result(decision)
+    
+    def _request_params(
+        self,
+        prompt: Tuple[List[Dict[str, Any]], str],
+        complexity: AnalysisComplexity
+    ) -> Dict[str, Any]:
+        """Messages API parameters for a routing prompt, shared by direct and batched calls."""
+        system, user_text = prompt
+        return {
+            "model": self.model_by_complexity[complexity],
+            "max_tokens": self._get_max_tokens(complexity),
+            "system": system,
+            "messages": [
+                {"role": "user", "content": user_text}
+            ]
+        }
+    
     def _determine_complexity(self, context: PaymentContext) -> AnalysisComplexity:
         """
         Intelligently determine analysis complexity based on context
         """
         
-        if context.urgency == DecisionUrgency.ROUTINE and not context.failed_processors:
+        urgency = context.urgency
+        failed_count = len(context.failed_processors)
+        
+        if urgency is DecisionUrgency.ROUTINE and failed_count == 0:
             return AnalysisComplexity.SIMPLE
-        elif context.amount > 5000 or len(context.failed_processors) > 1 or context.urgency == DecisionUrgency.ELEVATED:
+        if context.amount > self.COMPREHENSIVE_AMOUNT or failed_count > 1 or urgency is DecisionUrgency.ELEVATED:
             return AnalysisComplexity.COMPREHENSIVE
-        else:
-            return AnalysisComplexity.BALANCED
+        return AnalysisComplexity.BALANCED
     
     def _build_routing_prompt(
         self, 
         context: PaymentContext, 
         complexity: AnalysisComplexity
-    ) -> str:
-        """Build routing decision prompt with context"""
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Build the cached system blocks and per-request context for a routing decision"""
         
-        prompt = f"""
-You are an expert payment orchestration system. Analyze the following payment context and make an intelligent routing decision.
-
-PAYMENT ROUTING DECISION REQUIRED
-
-Transaction Context:
-- Amount: ${context.amount:,.2f} {context.currency}
-- Merchant: {context.merchant_id}
-- Urgency: {context.urgency.value}
-- Failed Processors: {context.failed_processors or 'None'}
-
-Available Processors:
-{json.dumps(context.processor_health, indent=2)}
-
-Risk Indicators:
-{json.dumps(context.risk_indicators, indent=2)}
-
-Business Rules:
-{json.dumps(context.business_rules, indent=2)}
-
-TASK: Select the best payment processor considering:
-1. Processor health and reliability
-2. Cost optimization 
-3. Risk mitigation
-4. Business requirements
-5. Regulatory compliance
-"""
+        prompt = ROUTING_CONTEXT_TEMPLATE.format_map({
+            "amount": context.amount,
+            "currency": context.currency,
+            "merchant_id": context.merchant_id,
+            "urgency": context.urgency.value,
+            "failed_processors": context.failed_processors or 'None',
+            "processor_health": _dumps_compact(context.processor_health),
+            "risk_indicators": _dumps_compact(context.risk_indicators),
+            "business_rules": _dumps_compact(context.business_rules)
+        })
         
-        if complexity == AnalysisComplexity.COMPREHENSIVE:
-            prompt += """
-
-COMPREHENSIVE ANALYSIS REQUIRED:
-- Perform deep analysis of all factors
-- Consider interaction effects between factors
-- Assess probability of success for each option
-- Identify potential failure modes and mitigations
-- Provide detailed step-by-step reasoning
-
-RESPONSE FORMAT:
-Provide your response in JSON format with:
-{
-  "selected_processor": "processor_id",
-  "confidence": 0.85,
-  "reasoning_steps": ["step 1", "step 2", ...],
-  "risk_assessment": "description",
-  "fallback_chain": ["backup1", "backup2"],
-  "business_justification": "detailed explanation",
-  "assumptions": ["assumption 1", "assumption 2"],
-  "monitoring_recommendations": ["monitor X", "watch for Y"]
-}
-"""
-        elif complexity == AnalysisComplexity.BALANCED:
-            prompt += """
-
-BALANCED ANALYSIS:
-- Evaluate key processors systematically
-- Consider main risk factors
-- Provide clear reasoning
-
-RESPONSE FORMAT:
-{
-  "selected_processor": "processor_id",
-  "confidence": 0.85,
-  "reasoning_steps": ["step 1", "step 2", "step 3"],
-  "risk_assessment": "description",
-  "fallback_chain": ["backup1", "backup2"]
-}
-"""
-        else:
-            prompt += """
-
-SIMPLE ANALYSIS:
-- Quick evaluation of available options
-- Focus on most critical factors
-
-RESPONSE FORMAT:
-{
-  "selected_processor": "processor_id", 
-  "confidence": 0.85,
-  "reasoning": "brief explanation"
-}
-"""
-        
-        return prompt
+        return ROUTING_SYSTEM_BLOCKS[complexity], prompt
     
     def _get_max_tokens(self, complexity: AnalysisComplexity) -> int:
         """Determine max tokens based on complexity"""
-        
-        token_limits = {
-            AnalysisComplexity.SIMPLE: 500,
-            AnalysisComplexity.BALANCED: 1500, 
-            AnalysisComplexity.COMPREHENSIVE: 3000
-        }
-        return token_limits[complexity]
+        return MAX_TOKENS[complexity]
     
     def _parse_claude_response(
         self,
@@ -255,19 +800,22 @@ RESPONSE FORMAT:
         
         try:
             # Try to parse JSON response
-            if '{' in raw_response and '}' in raw_response:
-                json_start = raw_response.index('{')
-                json_end = raw_response.rindex('}') + 1
-                json_str = raw_response[json_start:json_end]
-                parsed = json.loads(json_str)
-            else:
-                # Fallback parsing for non-JSON responses
+            parsed = self._extract_json(raw_response)
+            decision_type = "payment_routing"
+            if parsed is None:
+                # Truncated or malformed JSON: keep the leading fields Claude did send
+                parsed = self._extract_partial_json(raw_response)
+                decision_type = "payment_routing_partial"
+            if parsed is None:
+                # Fallback parsing for non-JSON responses. Keyword matching takes
+                # the first processor named anywhere, so these are never cached
                 parsed = {
                     "selected_processor": self._extract_processor(raw_response),
                     "confidence": 0.7,
                     "reasoning_steps": [raw_response[:500]],
                     "risk_assessment": "Standard risk level"
                 }
+                decision_type = "payment_routing_keyword"
             
             # Extract analysis steps from reasoning
             analysis_steps = self._extract_analysis_steps(
@@ -275,9 +823,9 @@ RESPONSE FORMAT:
             )
             
             return ClaudeDecision(
-                decision_id=f"dec_{uuid.uuid4().hex[:12]}",
+                decision_id=_new_decision_id(),
                 timestamp=datetime.utcnow(),
-                decision_type="payment_routing",
+                decision_type=decision_type,
                 selected_option=parsed.get("selected_processor", "stripe"),
                 confidence=parsed.get("confidence", 0.7),
                 reasoning_chain=parsed.get("reasoning_steps", []),
@@ -289,8 +837,50 @@ RESPONSE FORMAT:
             )
             
         except Exception as e:
-            print(f"⚠️  Error parsing Claude response: {e}")
-            return self._create_fallback_decision(context, str(e), complexity)
+            logger.warning("Error parsing Claude response: %s", e)
+            return self._create_fallback_decision(context, str(e), complexity, processing_time)
+    
+    def _extract_json(self, raw_response: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the decision object in Claude's reply.
+        
+        A reply that is pure JSON parses directly. Otherwise each balanced {...}
+        block is tried, preferring the last one with a selected_processor, so
+        commentary or an echoed format example before the answer does not
+        break parsing.
+        """
+        
+        try:
+            parsed = _loads(raw_response)
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
+        
+        first = decision = None
+        for block in _json_blocks(raw_response):
+            try:
+                candidate = _loads(block)
+            except ValueError:
+                continue
+            if "selected_processor" in candidate:
+                decision = candidate
+            elif first is None:
+                first = candidate
+        return decision if decision is not None else first
+    
+    def _extract_partial_json(self, raw_response: str) -> Optional[Dict[str, Any]]:
+        """Pick the leading decision fields out of a reply whose JSON does not parse"""
+        
+        selected = STREAM_PROCESSOR_PATTERN.search(raw_response)
+        if selected is None:
+            return None
+        confidence = STREAM_CONFIDENCE_PATTERN.search(raw_response)
+        return {
+            "selected_processor": selected.group(1),
+            "confidence": float(confidence.group(1)) if confidence else 0.7,
+            "reasoning_steps": [raw_response[:500]]
+        }
     
     def _extract_analysis_steps(
         self, 
@@ -299,30 +889,24 @@ RESPONSE FORMAT:
     ) -> List[Dict[str, Any]]:
         """Extract structured analysis steps from reasoning"""
         
-        steps = []
+        complexity_level = complexity.value
         
-        for i, step in enumerate(reasoning_chain):
-            steps.append({
+        return [
+            {
                 "step": i + 1,
                 "reasoning": step,
-                "confidence": 0.8 + (i * 0.05),  # Increasing confidence
+                "confidence": min(0.95, 0.8 + i * 0.05),  # Increasing confidence, capped below certainty
                 "factors_considered": self._extract_factors(step),
-                "complexity_level": complexity.value
-            })
-        
-        return steps
+                "complexity_level": complexity_level
+            }
+            for i, step in enumerate(reasoning_chain)
+        ]
     
     def _extract_factors(self, reasoning_text: str) -> List[str]:
         """Extract factors considered from reasoning text"""
         
-        factors = []
-        keywords = ["cost", "reliability", "risk", "speed", "compliance", "history", "health"]
-        
-        for keyword in keywords:
-            if keyword.lower() in reasoning_text.lower():
-                factors.append(keyword)
-        
-        return factors
+        found = {match.lower() for match in FACTOR_PATTERN.findall(reasoning_text)}
+        return [keyword for keyword in FACTOR_KEYWORDS if keyword in found]
     
     def _extract_processor(self, text: str) -> str:
         """Extract selected processor from text"""
@@ -339,45 +923,88 @@ RESPONSE FORMAT:
         self, 
         context: PaymentContext,
         error: str,
-        complexity: AnalysisComplexity
+        complexity: AnalysisComplexity,
+        processing_time: int = 0
     ) -> ClaudeDecision:
         """Create fallback decision when Claude fails"""
         
         return ClaudeDecision(
-            decision_id=f"dec_{uuid.uuid4().hex[:12]}",
+            decision_id=_new_decision_id(),
             timestamp=datetime.utcnow(),
             decision_type="payment_routing_fallback",
             selected_option="stripe",  # Safe default
-            confidence=0.5,
-            reasoning_chain=[f"Claude error: {error}", "Using fallback logic", "Selected most reliable processor"],
+            confidence=FALLBACK_CONFIDENCE,
+            reasoning_chain=[f"Claude error: {error}", *FALLBACK_REASONING_TAIL],
             complexity=complexity,
             tokens_used=0,
-            processing_time_ms=50,
+            processing_time_ms=processing_time,
             raw_response=f"Error: {error}",
             analysis_steps=[{
-                "step": 1,
+                **FALLBACK_STEP_TEMPLATE,
                 "reasoning": f"Claude API failed: {error}",
-                "confidence": 0.5,
-                "factors_considered": ["error_handling"],
-                "complexity_level": "fallback"
+                "factors_considered": ["error_handling"]
             }]
         )
     
+    def _record_decision(self, decision: ClaudeDecision):
+        """Append a decision to the history, keeping the running totals in step"""
+        
+        # Read the metrics first so a malformed decision leaves the totals untouched
+        metrics = self._decision_metrics(decision)
+        
+        if len(self.decision_history) == self.decision_history.maxlen:
+            self._add_to_totals(self._decision_metrics(self.decision_history[0]), -1)
+        
+        self.decision_history.append(decision)
+        self._add_to_totals(metrics, 1)
+    
+    @staticmethod
+    def _decision_metrics(decision: ClaudeDecision) -> Tuple[int, int, float, AnalysisComplexity, bool]:
+        """The values a decision contributes to the running totals"""
+        return (
+            int(decision.processing_time_ms),
+            int(decision.tokens_used),
+            float(decision.confidence),
+            decision.complexity,
+            "fallback" in decision.decision_type
+        )
+    
+    def _add_to_totals(self, metrics: Tuple[int, int, float, AnalysisComplexity, bool], sign: int):
+        """Add (sign=1) or remove (sign=-1) one decision's metrics from the running totals"""
+        
+        processing_time, tokens_used, confidence, complexity, is_fallback = metrics
+        agg = self._agg
+        agg["sum_time"] += sign * processing_time
+        agg["sum_tokens"] += sign * tokens_used
+        agg["sum_conf"] += sign * confidence
+        agg["high_conf"] += sign * (confidence > 0.8)
+        agg["complex"] += sign * (complexity in (AnalysisComplexity.COMPREHENSIVE, AnalysisComplexity.BALANCED))
+        agg["fallback"] += sign * is_fallback
+        
+        by_complexity = agg["by_complexity"]
+        by_complexity[complexity] += sign
+        if not by_complexity[complexity]:
+            del by_complexity[complexity]
+    
     def _log_decision(self, decision: ClaudeDecision):
         """Log Claude decision with key metrics"""
         
         confidence_icon = "🟢" if decision.confidence > 0.8 else "🟡" if decision.confidence > 0.6 else "🔴"
         
-        print(f"{confidence_icon} DECISION: {decision.selected_option}")
-        print(f"   Confidence: {decision.confidence:.1%}")
-        print(f"   Analysis steps: {len(decision.reasoning_chain)}")
-        print(f"   Processing: {decision.processing_time_ms}ms")
-        print(f"   Tokens: {decision.tokens_used}")
-        
-        if decision.complexity == AnalysisComplexity.COMPREHENSIVE:
-            print(f"   Analysis depth: {len(decision.analysis_steps)} steps")
-            for step in decision.analysis_steps[:2]:  # Show first 2 steps
-                print(f"     Step {step['step']}: {step['reasoning'][:60]}...")
+        # One record per decision; the fields are also attached for structured handlers
+        logger.info(
+            "%s DECISION: %s confidence=%.1f%% steps=%d processing=%dms tokens=%d",
+            confidence_icon, decision.selected_option, decision.confidence * 100,
+            len(decision.reasoning_chain), decision.processing_time_ms, decision.tokens_used,
+            extra={
+                "decision_id": decision.decision_id,
+                "selected_option": decision.selected_option,
+                "confidence": decision.confidence,
+                "complexity": decision.complexity.value,
+                "processing_time_ms": decision.processing_time_ms,
+                "tokens_used": decision.tokens_used
+            }
+        )
     
     async def analyze_decision_patterns(self) -> Dict[str, Any]:
         """
@@ -405,32 +1032,23 @@ RESPONSE FORMAT:
             }
         }
         
+        agg = self._agg
+        total = len(self.decision_history)
+        
         # Calculate complexity usage
-        for decision in self.decision_history:
-            complexity = decision.complexity.value
-            
-            analysis["complexity_usage"]["complexity_distribution"][complexity] = \
-                analysis["complexity_usage"]["complexity_distribution"].get(complexity, 0) + 1
+        analysis["complexity_usage"]["complexity_distribution"] = {
+            complexity.value: count for complexity, count in agg["by_complexity"].items()
+        }
         
         # Calculate performance metrics
-        total_time = sum(d.processing_time_ms for d in self.decision_history)
-        total_tokens = sum(d.tokens_used for d in self.decision_history)
-        total_confidence = sum(d.confidence for d in self.decision_history)
-        
-        analysis["performance_metrics"]["avg_processing_time"] = total_time / len(self.decision_history)
-        analysis["performance_metrics"]["avg_tokens_used"] = total_tokens / len(self.decision_history)
-        analysis["performance_metrics"]["avg_confidence"] = total_confidence / len(self.decision_history)
+        analysis["performance_metrics"]["avg_processing_time"] = agg["sum_time"] / total
+        analysis["performance_metrics"]["avg_tokens_used"] = agg["sum_tokens"] / total
+        analysis["performance_metrics"]["avg_confidence"] = agg["sum_conf"] / total
         
         # Calculate decision quality
-        analysis["decision_quality"]["high_confidence_decisions"] = sum(
-            1 for d in self.decision_history if d.confidence > 0.8
-        )
-        analysis["decision_quality"]["complex_decisions"] = sum(
-            1 for d in self.decision_history if d.complexity in [AnalysisComplexity.COMPREHENSIVE, AnalysisComplexity.BALANCED]
-        )
-        analysis["decision_quality"]["fallback_decisions"] = sum(
-            1 for d in self.decision_history if "fallback" in d.decision_type
-        )
+        analysis["decision_quality"]["high_confidence_decisions"] = agg["high_conf"]
+        analysis["decision_quality"]["complex_decisions"] = agg["complex"]
+        analysis["decision_quality"]["fallback_decisions"] = agg["fallback"]
         
         return analysis
 
@@ -446,6 +1064,7 @@ async def demo_claude_decision_engine():
     print("Showcasing adaptive complexity and clear reasoning")
     print("=" * 50)
     
+    log_listener = configure_decision_logging()
     engine = ClaudeDecisionEngine()
     
     # Demo scenarios with different complexity levels
@@ -487,8 +1106,7 @@ async def demo_claude_decision_engine():
         }
     ]
     
-    # Process each scenario
-    decisions = []
+    # Describe each scenario, then decide them all concurrently
     for i, scenario in enumerate(demo_scenarios, 1):
         print(f"\n{'='*30}")
         print(f"SCENARIO {i}: {scenario['name']}")
@@ -497,11 +1115,20 @@ async def demo_claude_decision_engine():
         print(f"💰 Amount: ${scenario['context'].amount:,.2f}")
         print(f"⚡ Urgency: {scenario['context'].urgency.value}")
         print(f"❌ Failed: {scenario['context'].failed_processors or 'None'}")
-        
-        decision = await engine.make_payment_routing_decision(scenario["context"])
-        decisions.append(decision)
-        
-        await asyncio.sleep(1)  # Rate limiting
+    
+    print()
+    decisions = await engine.make_payment_routing_decisions_bulk(
+        [scenario["context"] for scenario in demo_scenarios]
+    )
+    
+    for scenario, decision in zip(demo_scenarios, decisions):
+        confidence_icon = "🟢" if decision.confidence > 0.8 else "🟡" if decision.confidence > 0.6 else "🔴"
+        print(f"{confidence_icon} {scenario['name']}: {decision.selected_option}")
+        print(f"   Complexity: {decision.complexity.value} (expected {scenario['expected_complexity'].value})")
+        print(f"   Confidence: {decision.confidence:.1%}")
+        print(f"   Analysis steps: {len(decision.reasoning_chain)}")
+        print(f"   Processing: {decision.processing_time_ms}ms")
+        print(f"   Tokens: {decision.tokens_used}")
     
     # Analyze decision patterns
     print(f"\n{'='*50}")
@@ -528,6 +1155,10 @@ async def demo_claude_decision_engine():
     print("   ✅ Adaptive complexity demonstrated")
     print("   ✅ Clear reasoning captured") 
     print("   ✅ Simplified parameter management")
+    
+    await engine.aclose()
+    await shutdown_shared_clients()
+    log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -3,11 +3,14 @@ Intelligent Payment Router with Claude Reasoning
 Solves the core problem: When Stripe fails/freezes, intelligently reroute payments
 """
 
-from typing import Dict, List, Optional, Any, Tuple
+from typing import AbstractSet, Deque, Dict, FrozenSet, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
+from collections import Counter, deque
+from itertools import chain
 import asyncio
 import json
+import time
 from enum import Enum
 
 from processors.base import (
@@ -19,6 +22,31 @@ from processors.base import (
 )
 
 
+# Claude model for each analysis complexity: routine decisions go to the
+# faster, cheaper Haiku; the rest need Sonnet's reasoning
+MODEL_BY_COMPLEXITY = {
+    "simple": "claude-3-5-haiku-20241022",
+    "balanced": "claude-3-5-sonnet-20241022",
+    "comprehensive": "claude-3-5-sonnet-20241022"
+}
+DEFAULT_MODEL = MODEL_BY_COMPLEXITY["balanced"]
+
+# Recent-failure window, and how long a non-permanent failure benches a processor
+_ONE_HOUR = timedelta(hours=1)
+_THIRTY_MIN = timedelta(minutes=30)
+
+# Words in a decision's reasoning that show real-time insights shaped it
+INSIGHT_KEYWORDS = ("promotion", "sentiment", "insight", "discount")
+
+# Complexity label for decisions made without Claude, which keeps their ~0ms
+# timings out of the per-tier averages
+DETERMINISTIC_COMPLEXITY = "deterministic"
+
+# Complexities and urgencies that can wait for the Message Batches API
+BATCHABLE_COMPLEXITIES = frozenset({"simple", "balanced"})
+BATCHABLE_URGENCIES = frozenset({"normal"})
+
+
 class FailureType(Enum):
     ACCOUNT_FROZEN = "account_frozen"
     RATE_LIMITED = "rate_limited"  
@@ -30,7 +58,7 @@ class FailureType(Enum):
     TEMPORARY_OUTAGE = "temporary_outage"
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessorFailure:
     processor_id: str
     failure_type: FailureType
@@ -41,7 +69,7 @@ class ProcessorFailure:
     permanent: bool = False
 
 
-@dataclass 
+@dataclass(slots=True)
 class RoutingDecision:
     selected_processor: str
     reasoning: str
@@ -49,6 +77,8 @@ class RoutingDecision:
     fallback_chain: List[str]
     claude_params: Dict[str, Any]
     decision_time_ms: float
+    # Same as claude_params["complexity"], kept as a field for the analytics
+    complexity: str = "balanced"
 
 
 class ClaudeRouter:
@@ -60,14 +90,37 @@ class ClaudeRouter:
     - Network issues → retry with different region processor
     """
     
+    # Payments below this amount, with no failures around, skip Claude and
+    # go to the best-scored healthy processor
+    DETERMINISTIC_MAX_AMOUNT = 10.0
+    # Routing decisions in flight at once in make_routing_decisions_concurrent
+    MAX_CONCURRENT_DECISIONS = 10
+    # Failures kept in failure_history, oldest dropped first
+    FAILURE_HISTORY_SIZE = 10000
+    # Recent decisions kept in routing_decisions for audit; the analytics
+    # come from running totals and cover every decision
+    ROUTING_DECISIONS_SIZE = 10000
+    
     def __init__(self, anthropic_api_key: str = None, brave_api_key: str = None):
         from claude_client import ClaudeClient
         from brave_search_insights import PaymentInsightsOrchestrator
         
         self.claude_client = ClaudeClient()
         self.insights_orchestrator = PaymentInsightsOrchestrator(brave_api_key)
-        self.failure_history: List[ProcessorFailure] = []
-        self.routing_decisions: List[RoutingDecision] = []
+        self.failure_history: Deque[ProcessorFailure] = deque(maxlen=self.FAILURE_HISTORY_SIZE)
+        # The last hour's failures bucketed by minute, oldest bucket first, so
+        # recent-failure lookups never scan the whole history
+        self._failures_by_minute: Dict[int, List[ProcessorFailure]] = {}
+        self.routing_decisions: Deque[RoutingDecision] = deque(maxlen=self.ROUTING_DECISIONS_SIZE)
+        
+        # Running routing analytics, updated as each decision is recorded
+        self._total_count = 0
+        self._total_time = 0.0
+        self._count_by_complexity: Counter = Counter()
+        self._sum_time_by_complexity: Dict[str, float] = {}
+        self._count_by_processor: Counter = Counter()
+        self._insights_influenced_count = 0
+        self._bypassed_count = 0
         
         # Processor health tracking
         self.processor_health = {
@@ -98,7 +151,242 @@ class ClaudeRouter:
         - "comprehensive": Deep analysis for high-value or complex scenarios
         """
         
-        start_time = datetime.utcnow()
+        start = time.perf_counter()
+        
+        # Skip the Claude round trip when there is only one sensible answer
+        decision = self._try_deterministic_route(request, available_processors, context, complexity)
+        if decision is not None:
+            processing_time = (time.perf_counter() - start) * 1000
+            return self._record_routing_decision(
+                decision, available_processors, decision["claude_metadata"]["complexity"], processing_time
+            )
+        
+        complexity, claude_context, _ = await self._prepare_routing(
+            request, available_processors, context, complexity
+        )
+        
+        # Real Claude API call
+        decision = await self.claude_client.make_routing_decision(
+            context=claude_context,
+            complexity=complexity,
+            model=MODEL_BY_COMPLEXITY.get(complexity, DEFAULT_MODEL)
+        )
+        
+        processing_time = (time.perf_counter() - start) * 1000
+        
+        return self._record_routing_decision(decision, available_processors, complexity, processing_time)
+    
+    async def make_routing_decisions_concurrent(
+        self,
+        requests: List[PaymentRequest],
+        available_processors_list: List[List[Dict[str, Any]]],
+        contexts: Optional[List[Dict[str, Any]]] = None,
+        complexity: str = "balanced",
+        max_concurrency: int = MAX_CONCURRENT_DECISIONS
+    ) -> List[RoutingDecision]:
+        """
+        Route many payments at once, each with its own processors and context,
+        with at most max_concurrency Claude calls in flight.
+        
+        Decisions are returned in the order of requests; an unexpected error
+        for one payment is returned in its slot instead of failing the rest.
+        """
+        
+        if contexts is None:
+            contexts = [{} for _ in requests]
+        slots = asyncio.Semaphore(max_concurrency)
+        
+        async def bounded(
+            request: PaymentRequest,
+            available_processors: List[Dict[str, Any]],
+            context: Dict[str, Any]
+        ) -> RoutingDecision:
+            async with slots:
+                return await self.make_routing_decision(request, available_processors, context, complexity)
+        
+        return await asyncio.gather(
+            *(bounded(request, available_processors, context)
+              for request, available_processors, context in zip(requests, available_processors_list, contexts)),
+            return_exceptions=True
+        )
+    
+    async def make_routing_decisions_batch(
+        self,
+        requests: List[PaymentRequest],
+        available_processors: List[Dict[str, Any]],
+        contexts: Optional[List[Dict[str, Any]]] = None,
+        complexity: str = "balanced"
+    ) -> List[RoutingDecision]:
+        """
+        Route payments nobody is waiting on (bulk retries, reconciliation,
+        re-routing queued failures) through Claude's Message Batches API.
+        
+        Simple and balanced decisions for normal-urgency payments share one
+        batch at half the token cost; comprehensive, urgent and frozen-account
+        payments still get a direct call each. Decisions are returned in the
+        order of requests.
+        """
+        
+        start = time.perf_counter()
+        if contexts is None:
+            contexts = [{} for _ in requests]
+        
+        # Payments with only one sensible answer never reach Claude
+        bypassed: Dict[int, Dict[str, Any]] = {}
+        prepared: Dict[int, Tuple[str, Dict[str, Any], FrozenSet[str]]] = {}
+        for i, (request, context) in enumerate(zip(requests, contexts)):
+            decision = self._try_deterministic_route(request, available_processors, context, complexity)
+            if decision is not None:
+                bypassed[i] = decision
+            else:
+                prepared[i] = await self._prepare_routing(request, available_processors, context, complexity)
+        
+        # Split the batchable payments by complexity, remembering their positions
+        batched: Dict[str, List[int]] = {}
+        direct: List[int] = []
+        for i, (request_complexity, _, _) in prepared.items():
+            context = contexts[i]
+            if (request_complexity in BATCHABLE_COMPLEXITIES
+                    and context.get("urgency", "normal") in BATCHABLE_URGENCIES
+                    and not context.get("account_frozen")):
+                batched.setdefault(request_complexity, []).append(i)
+            else:
+                direct.append(i)
+        
+        async def route_batch(request_complexity: str, indices: List[int]) -> List[Tuple[int, Dict[str, Any]]]:
+            decisions = await self.claude_client.submit_routing_decisions_batch(
+                [prepared[i][1] for i in indices],
+                request_complexity,
+                model=MODEL_BY_COMPLEXITY.get(request_complexity, DEFAULT_MODEL)
+            )
+            return list(zip(indices, decisions))
+        
+        async def route_direct(i: int) -> List[Tuple[int, Dict[str, Any]]]:
+            request_complexity, claude_context, _ = prepared[i]
+            decision = await self.claude_client.make_routing_decision(
+                context=claude_context,
+                complexity=request_complexity,
+                model=MODEL_BY_COMPLEXITY.get(request_complexity, DEFAULT_MODEL)
+            )
+            return [(i, decision)]
+        
+        results = await asyncio.gather(
+            *(route_batch(request_complexity, indices) for request_complexity, indices in batched.items()),
+            *(route_direct(i) for i in direct)
+        )
+        
+        processing_time = (time.perf_counter() - start) * 1000
+        
+        routings: List[Optional[RoutingDecision]] = [None] * len(requests)
+        for i, decision in bypassed.items():
+            routings[i] = self._record_routing_decision(
+                decision, available_processors, decision["claude_metadata"]["complexity"], processing_time
+            )
+        for group in results:
+            for i, decision in group:
+                routings[i] = self._record_routing_decision(
+                    decision, available_processors, prepared[i][0], processing_time
+                )
+        return routings
+    
+    def _try_deterministic_route(
+        self,
+        request: PaymentRequest,
+        available_processors: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]],
+        complexity: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Decide locally when the answer doesn't need Claude: a single available
+        processor, a frozen primary with one healthy alternative that hasn't
+        failed recently, or a small payment with no failures around and a
+        healthy best-scored processor.
+        
+        Returns a decision shaped like Claude's, labelled with the
+        deterministic complexity, or None to ask Claude.
+        """
+        
+        context = context or {}
+        
+        if len(available_processors) == 1:
+            processor_id = available_processors[0]["id"]
+            return self._deterministic_decision(
+                processor_id, f"Selected {processor_id} - the only available processor.",
+                1.0, [], "single_processor"
+            )
+        
+        if context.get("account_frozen"):
+            alternatives = [
+                p["id"] for p in available_processors
+                if p["id"] != "stripe" and not self.processor_health.get(p["id"], {}).get("frozen")
+            ]
+            recently_failed = {f.processor_id for f in self._recent_failures() if not f.permanent}
+            if len(alternatives) == 1 and alternatives[0] not in recently_failed:
+                return self._deterministic_decision(
+                    alternatives[0],
+                    f"Primary processor (Stripe) is frozen. Routing to {alternatives[0]}, "
+                    f"the only healthy alternative.",
+                    0.95, [], "frozen_single_alternative"
+                )
+            return None
+        
+        if (complexity == "comprehensive"
+                or request.amount >= self.DETERMINISTIC_MAX_AMOUNT
+                or context.get("failures")
+                or context.get("high_risk")
+                or self._recent_failures()):
+            return None
+        
+        ranked_context = {
+            "processors": self._apply_insights_to_processors(available_processors, {}),
+            "failures": [],
+            "transaction": {"amount": request.amount}
+        }
+        processor_id = self._select_best_processor(ranked_context, failed_ids=frozenset())
+        health = self.processor_health.get(processor_id, {})
+        if health.get("frozen") or health.get("failure_count"):
+            return None
+        
+        return self._deterministic_decision(
+            processor_id, self._generate_reasoning(processor_id, ranked_context, "simple"),
+            0.85, [p["id"] for p in available_processors if p["id"] != processor_id],
+            "small_amount"
+        )
+    
+    @staticmethod
+    def _deterministic_decision(
+        processor_id: str,
+        reasoning: str,
+        confidence: float,
+        fallback_chain: List[str],
+        bypass: str
+    ) -> Dict[str, Any]:
+        """A locally made decision, shaped like the Claude client's."""
+        return {
+            "selected_processor": processor_id,
+            "reasoning": reasoning,
+            "confidence": confidence,
+            "fallback_chain": fallback_chain,
+            "claude_metadata": {
+                "complexity": DETERMINISTIC_COMPLEXITY,
+                "model": "deterministic",
+                "tokens_used": 0,
+                "bypass": bypass
+            }
+        }
+    
+    async def _prepare_routing(
+        self,
+        request: PaymentRequest,
+        available_processors: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]],
+        complexity: str
+    ) -> Tuple[str, Dict[str, Any], FrozenSet[str]]:
+        """
+        Settle the analysis complexity and build the Claude context for one
+        payment, along with the ids of processors with recent non-permanent
+        failures for local selection.
+        """
         
         # Determine complexity based on transaction
         if not complexity:
@@ -114,34 +402,38 @@ class ClaudeRouter:
         )
         
         # Prepare context for Claude
-        claude_context = self._prepare_claude_context(
+        claude_context, failed_ids = self._prepare_claude_context(
             request, 
             enhanced_processors, 
             context,
             insights_adjustments
         )
         
-        # Real Claude API call
-        decision = await self.claude_client.make_routing_decision(
-            context=claude_context,
-            complexity=complexity
-        )
-        
-        processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+        return complexity, claude_context, failed_ids
+    
+    def _record_routing_decision(
+        self,
+        decision: Dict[str, Any],
+        available_processors: List[Dict[str, Any]],
+        complexity: str,
+        processing_time: float
+    ) -> RoutingDecision:
+        """Turn Claude's decision into a RoutingDecision on an available processor and record it."""
         
         # Default to first available processor if Claude doesn't specify one
         default_processor = available_processors[0]["id"] if available_processors else "stripe"
         
         # Get the processor selected by Claude, but validate it's available
         claude_selected = decision.get("selected_processor", default_processor)
-        available_processor_ids = [p["id"] for p in available_processors]
+        available_ids = {p["id"] for p in available_processors}
         
         # If Claude selected an unavailable processor, use the default
-        if claude_selected not in available_processor_ids and available_processor_ids:
+        if claude_selected not in available_ids and available_ids:
             selected_processor = default_processor
         else:
             selected_processor = claude_selected
             
+        claude_metadata = decision.get("claude_metadata", {})
         routing = RoutingDecision(
             selected_processor=selected_processor,
             reasoning=decision.get("reasoning", "Claude routing decision"),
@@ -149,16 +441,38 @@ class ClaudeRouter:
             fallback_chain=decision.get("fallback_chain", [p["id"] for p in available_processors[1:]]),
             claude_params={
                 "complexity": complexity,
-                "model": decision.get("model", "claude-3-5-sonnet-20241022"),
-                "tokens_used": decision.get("tokens_used", 0),
-                "claude_metadata": decision.get("claude_metadata", {})
+                "model": claude_metadata.get("model", MODEL_BY_COMPLEXITY.get(complexity, DEFAULT_MODEL)),
+                "tokens_used": claude_metadata.get("tokens_used", 0),
+                "claude_metadata": claude_metadata
             },
-            decision_time_ms=processing_time
+            decision_time_ms=processing_time,
+            complexity=complexity
         )
         
         self.routing_decisions.append(routing)
+        self._count_routing_decision(routing)
         return routing
     
+    def _count_routing_decision(self, routing: RoutingDecision):
+        """Add a recorded decision to the running analytics."""
+        
+        complexity = routing.complexity
+        self._total_count += 1
+        self._total_time += routing.decision_time_ms
+        self._count_by_complexity[complexity] += 1
+        self._sum_time_by_complexity[complexity] = (
+            self._sum_time_by_complexity.get(complexity, 0.0) + routing.decision_time_ms
+        )
+        self._count_by_processor[routing.selected_processor] += 1
+        
+        if "bypass" in routing.claude_params.get("claude_metadata", {}):
+            self._bypassed_count += 1
+        
+        # Check if insights influenced this decision
+        reasoning = routing.reasoning.lower()
+        if any(keyword in reasoning for keyword in INSIGHT_KEYWORDS):
+            self._insights_influenced_count += 1
+    
     def _determine_complexity(
         self, 
         request: PaymentRequest,
@@ -289,16 +603,17 @@ class ClaudeRouter:
         available_processors: List[Dict[str, Any]],
         context: Optional[Dict[str, Any]],
         insights_adjustments: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
+    ) -> Tuple[Dict[str, Any], FrozenSet[str]]:
         """
         Prepare context for Claude to make routing decision.
+        
+        Also returns the ids of processors with recent non-permanent failures,
+        computed once here so local selection doesn't re-derive them.
         """
         
         # Get recent failures for this merchant
-        recent_failures = [
-            f for f in self.failure_history
-            if f.timestamp > datetime.utcnow() - timedelta(hours=1)
-        ]
+        recent_failures = self._recent_failures()
+        failed_ids = frozenset(f.processor_id for f in recent_failures if not f.permanent)
         
         claude_context = {
             "transaction": {
@@ -338,7 +653,7 @@ class ClaudeRouter:
                 "reason": "No real-time insights fetched for this transaction complexity level"
             }
         
-        return claude_context
+        return claude_context, failed_ids
     
     def _summarize_insights(self, insights_adjustments: Dict[str, Any]) -> str:
         """
@@ -364,11 +679,14 @@ class ClaudeRouter:
     async def _call_claude_analysis(
         self,
         context: Dict[str, Any],
-        complexity: str = "balanced"
+        complexity: str = "balanced",
+        failed_ids: Optional[AbstractSet[str]] = None
     ) -> Dict[str, Any]:
         """
         Simulate Claude API call with complexity parameters.
         In production, replace with actual Anthropic API call.
+        
+        failed_ids are the recently failed processors from _prepare_claude_context.
         """
         
         # Build the prompt based on context
@@ -400,7 +718,7 @@ class ClaudeRouter:
                 }
         
         # Normal routing - choose based on success rates and fees
-        best_processor = self._select_best_processor(context)
+        best_processor = self._select_best_processor(context, failed_ids)
         
         return {
             "processor": best_processor,
@@ -438,14 +756,24 @@ class ClaudeRouter:
         
         return prompt
     
-    def _select_best_processor(self, context: Dict[str, Any]) -> str:
-        """Enhanced processor selection logic using real-time insights."""
+    def _select_best_processor(
+        self,
+        context: Dict[str, Any],
+        failed_ids: Optional[AbstractSet[str]] = None
+    ) -> str:
+        """
+        Enhanced processor selection logic using real-time insights.
+        
+        failed_ids are the processors with recent non-permanent failures;
+        when not given they are read from the context's failures.
+        """
         
         processors = context["processors"]
         
         # Filter out recently failed processors
-        failed_ids = [f["processor"] for f in context["failures"] if not f.get("permanent")]
-        available = [p for p in processors if p["id"] not in failed_ids]
+        if failed_ids is None:
+            failed_ids = {f["processor"] for f in context["failures"] if not f.get("permanent")}
+        available = [p for p in processors if p["id"] not in failed_ids] if failed_ids else processors
         
         if not available:
             available = processors  # Use all if none available
@@ -473,10 +801,8 @@ class ClaudeRouter:
             
             return combined_score
         
-        # Sort by combined score (higher is better)
-        available.sort(key=processor_score, reverse=True)
-        
-        return available[0]["id"] if available else "stripe"
+        # Highest combined score wins; ties go to the earlier processor
+        return max(available, key=processor_score)["id"] if available else "stripe"
     
     def _generate_reasoning(
         self, 
@@ -544,17 +870,20 @@ class ClaudeRouter:
     ):
         """Record a processor failure for future routing decisions."""
         
+        now = datetime.utcnow()
         failure = ProcessorFailure(
             processor_id=processor_id,
             failure_type=failure_type,
             error_code=error_code,
             error_message=error_message,
-            timestamp=datetime.utcnow(),
+            timestamp=now,
             permanent=permanent,
-            retry_after=datetime.utcnow() + timedelta(minutes=30) if not permanent else None
+            retry_after=now + _THIRTY_MIN if not permanent else None
         )
         
         self.failure_history.append(failure)
+        self._failures_by_minute.setdefault(self._minute_bucket(failure.timestamp), []).append(failure)
+        self._evict_failure_buckets(now - _ONE_HOUR)
         
         # Update processor health
         if processor_id in self.processor_health:
@@ -562,6 +891,31 @@ class ClaudeRouter:
             if permanent or failure_type == FailureType.ACCOUNT_FROZEN:
                 self.processor_health[processor_id]["frozen"] = True
     
+    def _recent_failures(self) -> List[ProcessorFailure]:
+        """Failures recorded within the last hour, oldest first."""
+        cutoff = datetime.utcnow() - _ONE_HOUR
+        self._evict_failure_buckets(cutoff)
+        # Only the oldest remaining bucket can straddle the cutoff
+        return [
+            f for f in chain.from_iterable(self._failures_by_minute.values())
+            if f.timestamp > cutoff
+        ]
+    
+    def _evict_failure_buckets(self, cutoff: datetime):
+        """Drop the minute buckets that end before the cutoff."""
+        cutoff_bucket = self._minute_bucket(cutoff)
+        buckets = self._failures_by_minute
+        while buckets:
+            oldest = next(iter(buckets))
+            if oldest >= cutoff_bucket:
+                break
+            del buckets[oldest]
+    
+    @staticmethod
+    def _minute_bucket(timestamp: datetime) -> int:
+        """Index of the minute a timestamp falls in."""
+        return int(timestamp.timestamp() // 60)
+    
     def record_success(self, processor_id: str):
         """Record successful payment for processor health tracking."""
         
@@ -572,63 +926,32 @@ class ClaudeRouter:
     def get_routing_analytics(self) -> Dict[str, Any]:
         """Get comprehensive analytics on routing decisions and performance."""
         
-        total_decisions = len(self.routing_decisions)
+        total_decisions = self._total_count
         if total_decisions == 0:
             return {"message": "No routing decisions yet", "insights_analytics": self.get_insights_analytics()}
         
-        # Analyze complexity distribution
-        complexity_dist = {}
-        for decision in self.routing_decisions:
-            complexity = decision.claude_params.get("complexity", "balanced")
-            complexity_dist[complexity] = complexity_dist.get(complexity, 0) + 1
-        
         # Average decision time by complexity
-        avg_time_by_complexity = {}
-        for complexity in ["simple", "balanced", "comprehensive"]:
-            times = [
-                d.decision_time_ms for d in self.routing_decisions
-                if d.claude_params.get("complexity") == complexity
-            ]
-            if times:
-                avg_time_by_complexity[complexity] = sum(times) / len(times)
-        
-        # Analyze processor selection patterns
-        processor_selections = {}
-        insights_influenced_decisions = 0
-        
-        for decision in self.routing_decisions:
-            processor = decision.selected_processor
-            processor_selections[processor] = processor_selections.get(processor, 0) + 1
-            
-            # Check if insights influenced this decision
-            if hasattr(decision, 'reasoning') and any([
-                "promotion" in decision.reasoning.lower(),
-                "sentiment" in decision.reasoning.lower(),
-                "insight" in decision.reasoning.lower(),
-                "discount" in decision.reasoning.lower()
-            ]):
-                insights_influenced_decisions += 1
-        
-        # Calculate insights effectiveness
-        insights_effectiveness = 0.0
-        if total_decisions > 0:
-            insights_effectiveness = insights_influenced_decisions / total_decisions
+        avg_time_by_complexity = {
+            complexity: self._sum_time_by_complexity[complexity] / self._count_by_complexity[complexity]
+            for complexity in ("simple", "balanced", "comprehensive")
+            if self._count_by_complexity[complexity]
+        }
         
         return {
             "total_routing_decisions": total_decisions,
-            "complexity_distribution": complexity_dist,
-            "processor_selection_distribution": processor_selections,
-            "insights_influenced_decisions": insights_influenced_decisions,
-            "insights_effectiveness_percentage": insights_effectiveness * 100,
+            "complexity_distribution": dict(self._count_by_complexity),
+            "processor_selection_distribution": dict(self._count_by_processor),
+            "insights_influenced_decisions": self._insights_influenced_count,
+            "insights_effectiveness_percentage": self._insights_influenced_count / total_decisions * 100,
+            "claude_bypassed_decisions": self._bypassed_count,
+            "claude_bypass_percentage": self._bypassed_count / total_decisions * 100,
+            "model_by_complexity": MODEL_BY_COMPLEXITY,
             "average_decision_time_ms": {
                 "by_complexity": avg_time_by_complexity,
-                "overall": sum(d.decision_time_ms for d in self.routing_decisions) / total_decisions
+                "overall": self._total_time / total_decisions
             },
             "processor_health": self.processor_health,
-            "recent_failures": len([
-                f for f in self.failure_history
-                if f.timestamp > datetime.utcnow() - timedelta(hours=1)
-            ]),
+            "recent_failures": len(self._recent_failures()),
             "insights_analytics": self.get_insights_analytics()
         }
     
@@ -672,9 +995,10 @@ class ClaudeRouter:
                 )
                 
                 # Update cache
-                cache_key = f"periodic_{datetime.utcnow().hour}"
+                now = datetime.utcnow()
+                cache_key = f"periodic_{now.hour}"
                 self._insights_cache[cache_key] = insights
-                self._last_insights_fetch = datetime.utcnow()
+                self._last_insights_fetch = now
                 
                 # Clean up old cache entries
                 self.insights_orchestrator.cleanup_cache()
@@ -721,9 +1045,10 @@ class ClaudeRouter:
             )
             
             # Update cache with forced refresh
-            cache_key = f"forced_{datetime.utcnow().hour}_{datetime.utcnow().minute}"
+            now = datetime.utcnow()
+            cache_key = f"forced_{now.hour}_{now.minute}"
             self._insights_cache[cache_key] = insights
-            self._last_insights_fetch = datetime.utcnow()
+            self._last_insights_fetch = now
             
             return self.insights_orchestrator.get_routing_adjustments(insights)
             
@@ -5,8 +5,11 @@ Complete API server for synthetic data generation and risk analysis
 
 import asyncio
 import json
+import os
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Path
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
@@ -37,7 +40,7 @@ app.add_middleware(
 # Initialize components
 claude_client = ClaudeClient()
 data_generator = ClaudeSyntheticDataGenerator()
-risk_analyzer = ClaudeRiskAnalyzer()
+risk_analyzer = ClaudeRiskAnalyzer(claude_client)
 stream_simulator = RealtimeStreamSimulator()
 stream_data_store = StreamDataStore()
 
@@ -45,6 +48,14 @@ stream_data_store = StreamDataStore()
 active_streams = {}
 generated_datasets = {}
 
+# Advanced analyses reused for identical requests within this many seconds
+ANALYSIS_CACHE_TTL = 5.0
+_analysis_cache: Dict[Tuple[Any, ...], Tuple[float, RiskAnalysis]] = {}
+_analysis_in_flight: Dict[Tuple[Any, ...], asyncio.Task] = {}
+
+# Demo-only pause that mimics model reasoning time in the simulated analysis
+SIMULATE_ANALYSIS_LATENCY = os.getenv("SIMULATE_ANALYSIS_LATENCY", "").lower() in ("1", "true", "yes")
+
 
 class DataAnalysisRequest(BaseModel):
     transactions: List[Dict[str, Any]]
@@ -163,19 +174,20 @@ async def generate_synthetic_data(request: DataGenerationRequest):
             severity="high"
         )
         
-        charges = [t for t in transactions if t.type == "charge"]
-        refunds = [t for t in transactions if t.type == "refund"] 
-        adjustments = [t for t in transactions if t.type == "adjustment"]
+        type_counts = Counter(t.type for t in transactions)
+        charge_count = type_counts["charge"]
+        refund_count = type_counts["refund"]
+        adjustment_count = type_counts["adjustment"]
         
         return {
             "pattern_type": request.pattern_type,
             "transaction_count": len(transactions),
             "risk_indicators": {
-                "charges": len(charges),
-                "refunds": len(refunds),
-                "adjustments": len(adjustments),
-                "refund_rate": (len(refunds) / len(charges) * 100) if charges else 0,
-                "chargeback_rate": (len(adjustments) / len(charges) * 100) if charges else 0
+                "charges": charge_count,
+                "refunds": refund_count,
+                "adjustments": adjustment_count,
+                "refund_rate": (refund_count / charge_count * 100) if charge_count else 0,
+                "chargeback_rate": (adjustment_count / charge_count * 100) if charge_count else 0
             },
             "freeze_likelihood": "high" if request.pattern_type in ["chargeback_surge", "sudden_spike"] else "medium",
             "gpt5_analysis": {
@@ -250,21 +262,22 @@ async def generate_complete_demo_dataset():
     # Analyze each scenario
     scenario_analysis = {}
     for scenario_name, scenario_txns in dataset["freeze_scenarios"].items():
-        charges = [t for t in scenario_txns if t.type == "charge"]
-        refunds = [t for t in scenario_txns if t.type == "refund"]
-        adjustments = [t for t in scenario_txns if t.type == "adjustment"]
+        type_counts, charge_volume = _type_totals(scenario_txns)
+        charge_count = type_counts["charge"]
         
         scenario_analysis[scenario_name] = {
             "transaction_count": len(scenario_txns),
-            "charges": len(charges),
-            "refunds": len(refunds),
-            "adjustments": len(adjustments),
-            "refund_rate": (len(refunds) / len(charges) * 100) if charges else 0,
-            "chargeback_rate": (len(adjustments) / len(charges) * 100) if charges else 0,
-            "avg_amount": sum(t.amount for t in charges) / len(charges) if charges else 0,
+            "charges": charge_count,
+            "refunds": type_counts["refund"],
+            "adjustments": type_counts["adjustment"],
+            "refund_rate": (type_counts["refund"] / charge_count * 100) if charge_count else 0,
+            "chargeback_rate": (type_counts["adjustment"] / charge_count * 100) if charge_count else 0,
+            "avg_amount": charge_volume / charge_count if charge_count else 0,
             "freeze_risk": "high" if scenario_name in ["chargeback_surge", "sudden_spike"] else "medium"
         }
     
+    baseline_counts, baseline_volume = _type_totals(dataset["baseline"])
+    
     return {
         "dataset_summary": dataset["summary"],
         "total_transactions": len(all_transactions),
@@ -273,7 +286,7 @@ async def generate_complete_demo_dataset():
             "period": "30 days",
             "transaction_count": len(dataset["baseline"]),
             "daily_average": len(dataset["baseline"]) / 30,
-            "avg_amount": sum(t.amount for t in dataset["baseline"] if t.type == "charge") / len([t for t in dataset["baseline"] if t.type == "charge"])
+            "avg_amount": baseline_volume / baseline_counts["charge"]
         },
         "gpt5_capabilities_demonstrated": [
             "Structured data generation with schema compliance",
@@ -357,6 +370,18 @@ async def get_freeze_trigger_patterns():
     }
 
 
+def _type_totals(transactions: List[SyntheticTransaction]) -> Tuple[Counter, int]:
+    """Per-type transaction counts and total charge amount, in one pass."""
+    
+    type_counts = Counter()
+    charge_volume = 0
+    for t in transactions:
+        type_counts[t.type] += 1
+        if t.type == "charge":
+            charge_volume += t.amount
+    return type_counts, charge_volume
+
+
 async def _simulate_gpt5_risk_analysis(
     transactions: List[Dict[str, Any]],
     context: Dict[str, Any],
@@ -367,15 +392,13 @@ async def _simulate_gpt5_risk_analysis(
     In production, this would call the actual GPT-5 API.
     """
     
-    import asyncio
-    await asyncio.sleep(0.5 if reasoning_effort == "high" else 0.2)
+    if SIMULATE_ANALYSIS_LATENCY:
+        await asyncio.sleep(0.5 if reasoning_effort == "high" else 0.2)
     
     # Analyze transaction patterns
-    charges = [t for t in transactions if t.get("type") == "charge"]
-    refunds = [t for t in transactions if t.get("type") == "refund"] 
-    
-    total_charges = len(charges)
-    total_refunds = len(refunds)
+    type_counts = Counter(t.get("type") for t in transactions)
+    total_charges = type_counts["charge"]
+    total_refunds = type_counts["refund"]
     refund_rate = (total_refunds / total_charges * 100) if total_charges else 0
     
     # Calculate risk indicators
@@ -410,7 +433,7 @@ async def _simulate_gpt5_risk_analysis(
     
     Transaction Analysis:
     - Analyzed {len(transactions)} transactions
-    - Identified {len(charges)} charges, {len(refunds)} refunds
+    - Identified {total_charges} charges, {total_refunds} refunds
     - Calculated refund rate: {refund_rate:.1f}%
     
     Risk Assessment:
@@ -532,11 +555,14 @@ async def advanced_risk_analysis(request: RiskAnalysisRequest):
         if not transactions:
             raise HTTPException(status_code=404, detail="No transactions found for analysis")
         
-        # Perform advanced risk analysis
-        analysis = await risk_analyzer.analyze_transactions(
-            transactions=transactions,
-            reasoning_effort=request.reasoning_effort
+        # Perform advanced risk analysis, shared with identical requests while the store is unchanged
+        analysis_key = (
+            request.time_window_hours,
+            request.reasoning_effort,
+            request.include_gpt5_insights,
+            stream_data_store.total_processed
         )
+        analysis = await _shared_risk_analysis(analysis_key, transactions, request)
         
         return {
             "overall_risk": analysis.overall_risk.value,
@@ -554,7 +580,7 @@ async def advanced_risk_analysis(request: RiskAnalysisRequest):
                 for p in analysis.identified_patterns
             ],
             "recommendations": analysis.recommendations,
-            "gpt5_insights": analysis.gpt5_insights if request.include_gpt5_insights else {},
+            "gpt5_insights": analysis.gpt5_insights,
             "analysis_timestamp": analysis.analysis_timestamp.isoformat(),
             "transaction_count": len(transactions)
         }
@@ -563,6 +589,38 @@ async def advanced_risk_analysis(request: RiskAnalysisRequest):
         raise HTTPException(status_code=500, detail=f"Advanced analysis failed: {str(e)}")
 
 
+async def _shared_risk_analysis(
+    key: Tuple[Any, ...],
+    transactions: List[StripeTransaction],
+    request: RiskAnalysisRequest
+) -> RiskAnalysis:
+    """Run one analysis per key; concurrent callers await the same task and recent results are reused."""
+    
+    now = time.monotonic()
+    cached = _analysis_cache.get(key)
+    if cached and now - cached[0] < ANALYSIS_CACHE_TTL:
+        return cached[1]
+    
+    task = _analysis_in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(risk_analyzer.analyze_transactions(
+            transactions=transactions,
+            reasoning_effort=request.reasoning_effort,
+            include_gpt5_insights=request.include_gpt5_insights
+        ))
+        _analysis_in_flight[key] = task
+        task.add_done_callback(lambda _: _analysis_in_flight.pop(key, None))
+    
+    # Shielded so one disconnecting client doesn't cancel the analysis for the others
+    analysis = await asyncio.shield(task)
+    
+    # Keys from older store states are never requested again, so expire them here
+    for stale_key in [k for k, (at, _) in _analysis_cache.items() if now - at >= ANALYSIS_CACHE_TTL]:
+        del _analysis_cache[stale_key]
+    _analysis_cache[key] = (time.monotonic(), analysis)
+    return analysis
+
+
 @app.get("/gpt5/capabilities")
 async def get_gpt5_capabilities():
     """Get GPT-5 capabilities and current status"""
@@ -4,6 +4,7 @@ Generates continuous Stripe transaction streams for live data pipeline
 """
 
 import asyncio
+import bisect
 import json
 import time
 import random
@@ -13,6 +14,11 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
 
+try:
+    import orjson
+except ImportError:  # optional C serializer; falls back to the json module
+    orjson = None
+
 from claude_client import ClaudeClient
 from stripe_synthetic_data_generator import GPT5StripeDataGenerator, StripeTransaction
 
@@ -242,6 +248,13 @@ class RealtimeStreamSimulator:
         self.is_active = False
 
 
+def _jsonl_line(record: Dict[str, Any]) -> bytes:
+    """One newline-terminated JSON record, through orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record) + "\n").encode()
+
+
 class StreamDataStore:
     """
     In-memory data store for streaming transactions
@@ -249,18 +262,28 @@ class StreamDataStore:
     
     def __init__(self, max_size: int = 10000):
         self.transactions = []
+        # Sorted stream timestamps parallel to self.transactions, used to bisect time ranges
+        self._timestamps = []
         self.max_size = max_size
         self.total_processed = 0
     
     def add_transaction(self, stream_data: StreamData):
         """Add transaction to store"""
         
-        self.transactions.append(stream_data)
+        ts = stream_data.stream_timestamp
+        if not self._timestamps or ts >= self._timestamps[-1]:
+            self.transactions.append(stream_data)
+            self._timestamps.append(ts)
+        else:
+            index = bisect.bisect_right(self._timestamps, ts)
+            self.transactions.insert(index, stream_data)
+            self._timestamps.insert(index, ts)
         self.total_processed += 1
         
         # Keep store size manageable
         if len(self.transactions) > self.max_size:
             self.transactions = self.transactions[-self.max_size//2:]
+            self._timestamps = self._timestamps[-self.max_size//2:]
     
     def get_recent_transactions(self, count: int = 100) -> List[StreamData]:
         """Get most recent transactions"""
@@ -273,10 +296,9 @@ class StreamDataStore:
     ) -> List[StreamData]:
         """Get transactions within time range"""
         
-        return [
-            data for data in self.transactions
-            if start_time <= data.stream_timestamp <= end_time
-        ]
+        lo = bisect.bisect_left(self._timestamps, start_time)
+        hi = bisect.bisect_right(self._timestamps, end_time)
+        return self.transactions[lo:hi]
     
     def get_high_risk_transactions(self, threshold: float = 50.0) -> List[StreamData]:
         """Get high risk transactions"""
@@ -289,14 +311,14 @@ class StreamDataStore:
     def export_to_jsonl(self, filename: str):
         """Export all transactions to JSONL format"""
         
-        with open(filename, 'w') as f:
+        with open(filename, 'wb') as f:
             for stream_data in self.transactions:
-                record = {
-                    "transaction": asdict(stream_data.transaction),
+                f.write(_jsonl_line({
+                    # orjson serializes dataclasses natively, skipping the asdict() deep copy
+                    "transaction": stream_data.transaction if orjson is not None else asdict(stream_data.transaction),
                     "metadata": stream_data.metadata,
                     "stream_timestamp": stream_data.stream_timestamp.isoformat()
-                }
-                f.write(json.dumps(record) + '\n')
+                }))
         
         print(f"Exported {len(self.transactions)} transactions to {filename}")
 
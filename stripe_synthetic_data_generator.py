@@ -4,6 +4,7 @@ Demonstrates GPT-5's reasoning_effort and verbosity parameters for B2B payment o
 """
 
 import os
+import re
 import asyncio
 import json
 from datetime import datetime, timedelta
@@ -19,6 +20,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Outermost JSON array in a model response
+JSON_ARRAY_PATTERN = re.compile(r'\[.*\]', re.DOTALL)
+
 
 class ReasoningEffort(Enum):
     MINIMAL = "minimal"
@@ -297,8 +301,7 @@ JSON array of transactions following Stripe schema
         
         try:
             # Look for JSON array in response
-            import re
-            json_match = re.search(r'\[.*\]', raw_response, re.DOTALL)
+            json_match = JSON_ARRAY_PATTERN.search(raw_response)
             if json_match:
                 json_data = json.loads(json_match.group())
                 
@@ -5,10 +5,11 @@ Generates realistic transaction data, risk profiles, and insights to replace har
 
 import random
 import json
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from enum import Enum
 import numpy as np
 
@@ -89,6 +90,32 @@ class SyntheticDataGenerator:
     Generates realistic synthetic data for payment orchestration testing
     """
     
+    # (title, content, discount_percentage, valid_days)
+    PROMOTION_TEMPLATES = (
+        ("Q4 Business Promotion", "Special rates for business accounts", 0.5, 90),
+        ("New Merchant Discount", "First 6 months reduced fees", 0.8, 180),
+        ("Volume Discount", "Reduced rates for high-volume merchants", 0.3, 365),
+        ("Startup Special", "Special pricing for startups", 1.0, 60),
+        ("Holiday Processing Rates", "Reduced fees during peak season", 0.4, 30)
+    )
+    
+    # (fraud_type, risk_level, trend_direction, affected_regions, mitigation_measures);
+    # the region and measure tuples are copied into fresh lists for every insight
+    FRAUD_SCENARIOS = (
+        ("account_takeover", "high", "increasing", ("US", "EU"), ("2fa_required",)),
+        ("synthetic_identity", "medium", "stable", ("US",), ("enhanced_verification",)),
+        ("card_testing", "low", "decreasing", ("global",), ("velocity_limits",)),
+        ("social_engineering", "high", "increasing", ("US", "APAC"), ("user_education",))
+    )
+    
+    REGULATION_TYPES = ("PCI DSS", "GDPR", "AML", "KYC")
+    SOCIAL_PLATFORMS = ("Twitter", "Reddit", "LinkedIn", "Facebook")
+    
+    # Absolute dates are precomputed for every whole-day offset in this range
+    # and reused for DATE_TABLE_TTL seconds instead of adding timedeltas per insight
+    DATE_TABLE_DAYS = range(-90, 366)
+    DATE_TABLE_TTL = 300
+    
     def __init__(self, seed: Optional[int] = None):
         if seed:
             random.seed(seed)
@@ -97,6 +124,30 @@ class SyntheticDataGenerator:
         self.processors = self._generate_processor_profiles()
         self.merchant_profiles = self._generate_merchant_profiles()
         
+        # Prebuilt static insight fields keyed by (insight kind, processor id);
+        # generators only fill in the per-call random fields via replace()
+        self._insight_templates: Dict[Tuple[str, str], List[SearchInsight]] = {}
+        
+        self._date_table: Dict[int, datetime] = {}
+        self._date_table_built_at = float("-inf")
+    
+    def _get_insight_templates(self, kind: str, processor_id: str, build) -> List[SearchInsight]:
+        """Return the cached insight templates for a processor, building them on first use"""
+        key = (kind, processor_id)
+        templates = self._insight_templates.get(key)
+        if templates is None:
+            templates = self._insight_templates[key] = build(processor_id)
+        return templates
+    
+    def _get_date_table(self) -> Dict[int, datetime]:
+        """Return utcnow shifted by each day offset, rebuilt at most every DATE_TABLE_TTL seconds"""
+        built_at = time.monotonic()
+        if built_at - self._date_table_built_at >= self.DATE_TABLE_TTL:
+            now = datetime.utcnow()
+            self._date_table = {days: now + timedelta(days=days) for days in self.DATE_TABLE_DAYS}
+            self._date_table_built_at = built_at
+        return self._date_table
+        
     def _generate_processor_profiles(self) -> List[SyntheticProcessorProfile]:
         """Generate realistic processor profiles"""
         return [
@@ -353,56 +404,64 @@ class SyntheticDataGenerator:
     
     def _generate_promotion_insights(self, processor_id: str, count: int) -> List[PromotionInsight]:
         """Generate synthetic promotion insights"""
-        insights = []
+        templates = self._get_insight_templates("promotions", processor_id, self._build_promotion_templates)
+        dates = self._get_date_table()
         
-        promotion_templates = [
-            ("Q4 Business Promotion", "Special rates for business accounts", 0.5, 90),
-            ("New Merchant Discount", "First 6 months reduced fees", 0.8, 180),
-            ("Volume Discount", "Reduced rates for high-volume merchants", 0.3, 365),
-            ("Startup Special", "Special pricing for startups", 1.0, 60),
-            ("Holiday Processing Rates", "Reduced fees during peak season", 0.4, 30)
+        return [
+            replace(
+                template,
+                confidence_score=random.uniform(0.7, 0.95),
+                timestamp=dates[0],
+                valid_until=dates[promotion[3]],
+                minimum_transaction=random.choice([None, 100.0, 500.0, 1000.0])
+            )
+            for template, promotion in zip(templates[:count], self.PROMOTION_TEMPLATES)
         ]
-        
-        for i in range(min(count, len(promotion_templates))):
-            template = promotion_templates[i]
-            
-            insight = PromotionInsight(
+    
+    def _build_promotion_templates(self, processor_id: str) -> List[PromotionInsight]:
+        """Build the static part of a processor's promotion insights"""
+        return [
+            PromotionInsight(
                 insight_type=InsightType.PROMOTIONS,
                 processor_id=processor_id,
-                title=f"{processor_id.title()} {template[0]}",
-                content=template[1],
+                title=f"{processor_id.title()} {promotion[0]}",
+                content=promotion[1],
                 source_url=f"https://{processor_id}.com/promotions/{i}",
-                confidence_score=random.uniform(0.7, 0.95),
-                timestamp=datetime.utcnow(),
-                discount_percentage=template[2],
-                valid_until=datetime.utcnow() + timedelta(days=template[3]),
-                minimum_transaction=random.choice([None, 100.0, 500.0, 1000.0]),
-                impact_score=template[2] / 100 * 2
+                confidence_score=0.0,
+                timestamp=None,
+                discount_percentage=promotion[2],
+                impact_score=promotion[2] / 100 * 2
             )
-            insights.append(insight)
-        
-        return insights
+            for i, promotion in enumerate(self.PROMOTION_TEMPLATES)
+        ]
     
     def _generate_fraud_trend_insights(self, processor_id: str, count: int) -> List[FraudTrendInsight]:
         """Generate synthetic fraud trend insights"""
-        insights = []
+        templates = self._get_insight_templates("fraud_trends", processor_id, self._build_fraud_trend_templates)
+        dates = self._get_date_table()
         
-        fraud_scenarios = [
-            ("account_takeover", "high", "increasing", ["US", "EU"], ["2fa_required"]),
-            ("synthetic_identity", "medium", "stable", ["US"], ["enhanced_verification"]),
-            ("card_testing", "low", "decreasing", ["global"], ["velocity_limits"]),
-            ("social_engineering", "high", "increasing", ["US", "APAC"], ["user_education"])
+        return [
+            replace(
+                template,
+                confidence_score=random.uniform(0.8, 0.95),
+                timestamp=dates[-random.randint(1, 7)],
+                affected_regions=list(template.affected_regions),
+                mitigation_measures=list(template.mitigation_measures)
+            )
+            for template in templates[:count]
         ]
-        
-        for i, scenario in enumerate(fraud_scenarios[:count]):
-            insight = FraudTrendInsight(
+    
+    def _build_fraud_trend_templates(self, processor_id: str) -> List[FraudTrendInsight]:
+        """Build the static part of a processor's fraud trend insights"""
+        return [
+            FraudTrendInsight(
                 insight_type=InsightType.FRAUD_TRENDS,
                 processor_id=processor_id,
                 title=f"{processor_id.title()} {scenario[0].replace('_', ' ').title()} Alert",
                 content=f"Recent trends in {scenario[0]} affecting {processor_id} merchants",
                 source_url=f"https://security.{processor_id}.com/alerts/{i}",
-                confidence_score=random.uniform(0.8, 0.95),
-                timestamp=datetime.utcnow() - timedelta(days=random.randint(1, 7)),
+                confidence_score=0.0,
+                timestamp=None,
                 fraud_type=scenario[0],
                 risk_level=scenario[1],
                 trend_direction=scenario[2],
@@ -410,9 +469,8 @@ class SyntheticDataGenerator:
                 mitigation_measures=scenario[4],
                 impact_score={"low": 0.2, "medium": 0.5, "high": 0.8, "critical": 0.95}[scenario[1]]
             )
-            insights.append(insight)
-        
-        return insights
+            for i, scenario in enumerate(self.FRAUD_SCENARIOS)
+        ]
     
     def _generate_service_status_insights(self, processor_id: str, count: int) -> List[ServiceStatusInsight]:
         """Generate synthetic service status insights"""
@@ -445,21 +503,16 @@ class SyntheticDataGenerator:
     
     def _generate_social_sentiment_insights(self, processor_id: str, count: int) -> List[SocialSentimentInsight]:
         """Generate synthetic social sentiment insights"""
+        templates = self._get_insight_templates("social_sentiment", processor_id, self._build_social_sentiment_templates)
         insights = []
-        platforms = ["Twitter", "Reddit", "LinkedIn", "Facebook"]
         
-        for i, platform in enumerate(platforms[:count]):
+        for template in templates[:count]:
             sentiment_score = random.uniform(-0.3, 0.8) if processor_id != "stripe" else random.uniform(0.4, 0.9)
             
-            insight = SocialSentimentInsight(
-                insight_type=InsightType.SOCIAL_SENTIMENT,
-                processor_id=processor_id,
-                title=f"{processor_id.title()} {platform} Sentiment Analysis",
-                content=f"Community sentiment analysis from {platform} discussions",
-                source_url=f"https://sentiment-analysis.com/{processor_id}/{platform.lower()}",
+            insight = replace(
+                template,
                 confidence_score=random.uniform(0.6, 0.85),
                 timestamp=datetime.utcnow() - timedelta(hours=random.randint(1, 48)),
-                platform=platform,
                 sentiment_score=sentiment_score,
                 mention_count=random.randint(50, 500),
                 positive_mentions=int(random.randint(50, 500) * max(0, sentiment_score + 1) / 2),
@@ -470,6 +523,22 @@ class SyntheticDataGenerator:
         
         return insights
     
+    def _build_social_sentiment_templates(self, processor_id: str) -> List[SocialSentimentInsight]:
+        """Build the static part of a processor's social sentiment insights"""
+        return [
+            SocialSentimentInsight(
+                insight_type=InsightType.SOCIAL_SENTIMENT,
+                processor_id=processor_id,
+                title=f"{processor_id.title()} {platform} Sentiment Analysis",
+                content=f"Community sentiment analysis from {platform} discussions",
+                source_url=f"https://sentiment-analysis.com/{processor_id}/{platform.lower()}",
+                confidence_score=0.0,
+                timestamp=None,
+                platform=platform
+            )
+            for platform in self.SOCIAL_PLATFORMS
+        ]
+    
     def _generate_competitive_insights(self, processor_id: str, count: int) -> List[CompetitiveAnalysisInsight]:
         """Generate synthetic competitive analysis insights"""
         insights = []
@@ -594,27 +663,37 @@ class SyntheticDataGenerator:
     
     def _generate_regulatory_insights(self, processor_id: str, count: int) -> List[RegulatoryInsight]:
         """Generate synthetic regulatory insights"""
-        insights = []
+        templates = self._get_insight_templates("regulations", processor_id, self._build_regulatory_templates)
+        dates = self._get_date_table()
         
-        reg_types = ["PCI DSS", "GDPR", "AML", "KYC"]
-        for i, reg_type in enumerate(reg_types[:count]):
-            insight = RegulatoryInsight(
+        return [
+            replace(
+                template,
+                confidence_score=random.uniform(0.85, 0.95),
+                timestamp=dates[-random.randint(1, 90)],
+                effective_date=dates[random.randint(30, 180)]
+            )
+            for template in templates[:count]
+        ]
+    
+    def _build_regulatory_templates(self, processor_id: str) -> List[RegulatoryInsight]:
+        """Build the static part of the regulatory insights, which apply to every processor (processor_id "all")"""
+        return [
+            RegulatoryInsight(
                 insight_type=InsightType.REGULATIONS,
                 processor_id="all",
                 title=f"New {reg_type} Requirements 2024",
                 content=f"Updated {reg_type} compliance requirements affecting payment processors",
                 source_url=f"https://compliance.gov/{reg_type.lower()}/updates",
-                confidence_score=random.uniform(0.85, 0.95),
-                timestamp=datetime.utcnow() - timedelta(days=random.randint(1, 90)),
+                confidence_score=0.0,
+                timestamp=None,
                 regulation_type=reg_type,
                 region="US",
                 compliance_requirement=f"Enhanced {reg_type} compliance measures",
-                effective_date=datetime.utcnow() + timedelta(days=random.randint(30, 180)),
                 impact_score=0.7 if reg_type != "general" else 0.4
             )
-            insights.append(insight)
-        
-        return insights
+            for reg_type in self.REGULATION_TYPES
+        ]
     
     def _generate_market_sentiment_insights(self, processor_id: str, count: int) -> List[MarketSentimentInsight]:
         """Generate synthetic market sentiment insights"""